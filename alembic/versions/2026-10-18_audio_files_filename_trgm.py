@@ -0,0 +1,47 @@
+"""Add trigram index for audio file name search
+
+Revision ID: d2f85a7b3e19
+Revises: 6e3a8d1c4f97
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f85a7b3e19'
+down_revision: Union[str, None] = '6e3a8d1c4f97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # btree_gin позволяет добавить user_id в тот же GIN индекс, что и триграммы
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_audio_files_user_id_filename_trgm',
+            'audio_files',
+            ['user_id', 'filename', 'original_filename'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={
+                'filename': 'gin_trgm_ops',
+                'original_filename': 'gin_trgm_ops',
+            },
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_audio_files_user_id_filename_trgm',
+            table_name='audio_files',
+            postgresql_concurrently=True,
+        )
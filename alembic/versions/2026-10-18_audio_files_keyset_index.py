@@ -0,0 +1,39 @@
+"""Add audio_files keyset pagination index
+
+Revision ID: c47a0e9d3b15
+Revises: 8b2e4d6f1a93
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47a0e9d3b15'
+down_revision: Union[str, None] = '8b2e4d6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_audio_files_user_id_created_at_id',
+            'audio_files',
+            ['user_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_audio_files_user_id_created_at_id',
+            table_name='audio_files',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,45 @@
+"""Add audio metadata columns to audio_files
+
+Revision ID: 5d9e2b7c8a41
+Revises: c47a0e9d3b15
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d9e2b7c8a41'
+down_revision: Union[str, None] = 'c47a0e9d3b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('audio_files', sa.Column('size_bytes', sa.BigInteger(), nullable=True))
+    op.add_column('audio_files', sa.Column('duration', sa.Float(), nullable=True))
+    op.add_column('audio_files', sa.Column('codec', sa.String(), nullable=True))
+    op.add_column('audio_files', sa.Column('sample_rate', sa.Integer(), nullable=True))
+    op.add_column('audio_files', sa.Column('channels', sa.Integer(), nullable=True))
+    op.add_column('audio_files', sa.Column('bitrate', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_audio_files_size_bytes'), 'audio_files', ['size_bytes'], unique=False)
+    op.create_index(op.f('ix_audio_files_duration'), 'audio_files', ['duration'], unique=False)
+    op.create_index(op.f('ix_audio_files_codec'), 'audio_files', ['codec'], unique=False)
+    op.create_index(op.f('ix_audio_files_sample_rate'), 'audio_files', ['sample_rate'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_audio_files_sample_rate'), table_name='audio_files')
+    op.drop_index(op.f('ix_audio_files_codec'), table_name='audio_files')
+    op.drop_index(op.f('ix_audio_files_duration'), table_name='audio_files')
+    op.drop_index(op.f('ix_audio_files_size_bytes'), table_name='audio_files')
+    op.drop_column('audio_files', 'bitrate')
+    op.drop_column('audio_files', 'channels')
+    op.drop_column('audio_files', 'sample_rate')
+    op.drop_column('audio_files', 'codec')
+    op.drop_column('audio_files', 'duration')
+    op.drop_column('audio_files', 'size_bytes')
@@ -0,0 +1,58 @@
+"""Replace trigram GIN index with GiST index for ordered name search
+
+Revision ID: b93d4f6a2c18
+Revises: 8c1e5f3a7d26
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b93d4f6a2c18'
+down_revision: Union[str, None] = '8c1e5f3a7d26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # GiST индекс отдает строки сразу в порядке похожести (KNN), поэтому
+    # поиск с LIMIT не ранжирует все совпадения. btree_gist нужен для
+    # user_id и id в том же индексе: id задает порядок строк с равной похожестью
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_audio_files_user_id_search_name_trgm "
+            "ON audio_files USING gist "
+            "(user_id, (filename || ' ' || original_filename) gist_trgm_ops, id)"
+        )
+        op.drop_index(
+            'ix_audio_files_user_id_filename_trgm',
+            table_name='audio_files',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_audio_files_user_id_filename_trgm',
+            'audio_files',
+            ['user_id', 'filename', 'original_filename'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={
+                'filename': 'gin_trgm_ops',
+                'original_filename': 'gin_trgm_ops',
+            },
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_audio_files_user_id_search_name_trgm',
+            table_name='audio_files',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,43 @@
+"""Create blobs for content-addressed storage
+
+Revision ID: e81f3a6c0b27
+Revises: 5d9e2b7c8a41
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e81f3a6c0b27'
+down_revision: Union[str, None] = '5d9e2b7c8a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('storage_path', sa.String(), nullable=False),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('refcount', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('sha256'),
+    sa.UniqueConstraint('storage_path')
+    )
+    op.create_index(op.f('ix_blobs_refcount'), 'blobs', ['refcount'], unique=False)
+    op.add_column('audio_files', sa.Column('blob_sha256', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_audio_files_blob_sha256'), 'audio_files', ['blob_sha256'], unique=False)
+    op.create_foreign_key('audio_files_blob_sha256_fkey', 'audio_files', 'blobs', ['blob_sha256'], ['sha256'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('audio_files_blob_sha256_fkey', 'audio_files', type_='foreignkey')
+    op.drop_index(op.f('ix_audio_files_blob_sha256'), table_name='audio_files')
+    op.drop_column('audio_files', 'blob_sha256')
+    op.drop_index(op.f('ix_blobs_refcount'), table_name='blobs')
+    op.drop_table('blobs')
@@ -0,0 +1,43 @@
+"""Create pending_uploads
+
+Revision ID: 3f1c9a7e52d4
+Revises: a6d5d8115257
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7e52d4'
+down_revision: Union[str, None] = 'a6d5d8115257'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('pending_uploads',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('storage_path', sa.String(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_pending_uploads_id'), 'pending_uploads', ['id'], unique=False)
+    op.create_index(op.f('ix_pending_uploads_user_id'), 'pending_uploads', ['user_id'], unique=False)
+    op.create_index(op.f('ix_pending_uploads_expires_at'), 'pending_uploads', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_pending_uploads_expires_at'), table_name='pending_uploads')
+    op.drop_index(op.f('ix_pending_uploads_user_id'), table_name='pending_uploads')
+    op.drop_index(op.f('ix_pending_uploads_id'), table_name='pending_uploads')
+    op.drop_table('pending_uploads')
@@ -0,0 +1,40 @@
+"""Create user_usage with storage counters per user
+
+Revision ID: 2b7f4c9e1d53
+Revises: 9a4c7e1f2b68
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b7f4c9e1d53'
+down_revision: Union[str, None] = '9a4c7e1f2b68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_usage',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('files', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Начальные значения для существующих файлов; дальше счетчики ведет приложение
+    op.execute(
+        "INSERT INTO user_usage (user_id, size_bytes, files) "
+        "SELECT user_id, coalesce(sum(size_bytes), 0), count(*) "
+        "FROM audio_files GROUP BY user_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_usage')
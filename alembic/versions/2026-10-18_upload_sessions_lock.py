@@ -0,0 +1,29 @@
+"""Add lease columns to upload_sessions
+
+Revision ID: 4a7c2e9b1f65
+Revises: b93d4f6a2c18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a7c2e9b1f65'
+down_revision: Union[str, None] = 'b93d4f6a2c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('upload_sessions', sa.Column('lock_token', sa.String(length=32), nullable=True))
+    op.add_column('upload_sessions', sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('upload_sessions', 'locked_until')
+    op.drop_column('upload_sessions', 'lock_token')
@@ -0,0 +1,48 @@
+"""Add last_upload_at and sort indexes to user_usage
+
+Revision ID: 6e3a8d1c4f97
+Revises: 2b7f4c9e1d53
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e3a8d1c4f97'
+down_revision: Union[str, None] = '2b7f4c9e1d53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_usage', sa.Column('last_upload_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute(
+        "UPDATE user_usage SET last_upload_at = latest.created_at "
+        "FROM (SELECT user_id, max(created_at) AS created_at FROM audio_files GROUP BY user_id) AS latest "
+        "WHERE user_usage.user_id = latest.user_id"
+    )
+    # Строка нужна каждому пользователю, чтобы список со статистикой обходился без LEFT JOIN
+    op.execute(
+        "INSERT INTO user_usage (user_id, size_bytes, files) "
+        "SELECT id, 0, 0 FROM users ON CONFLICT (user_id) DO NOTHING"
+    )
+    op.create_index('ix_user_usage_size_bytes_user_id', 'user_usage', ['size_bytes', 'user_id'], unique=False)
+    op.create_index('ix_user_usage_files_user_id', 'user_usage', ['files', 'user_id'], unique=False)
+    op.create_index(
+        'ix_user_usage_last_upload_at_user_id',
+        'user_usage',
+        [sa.text('last_upload_at NULLS FIRST'), 'user_id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_usage_last_upload_at_user_id', table_name='user_usage')
+    op.drop_index('ix_user_usage_files_user_id', table_name='user_usage')
+    op.drop_index('ix_user_usage_size_bytes_user_id', table_name='user_usage')
+    op.drop_column('user_usage', 'last_upload_at')
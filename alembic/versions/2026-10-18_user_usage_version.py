@@ -0,0 +1,30 @@
+"""Add library version to user_usage
+
+Revision ID: 8c1e5f3a7d26
+Revises: d2f85a7b3e19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1e5f3a7d26'
+down_revision: Union[str, None] = 'd2f85a7b3e19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'user_usage',
+        sa.Column('version', sa.BigInteger(), server_default='0', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_usage', 'version')
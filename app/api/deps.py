@@ -1,15 +1,21 @@
+import math
 from typing import AsyncGenerator, Generator
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.metrics import upload_rejections
+from app.core.ratelimit import upload_limiter
 from app.core.s3 import s3_client
 from app.crud import crud_user
 from app.db.models import User
-from app.db.session import async_session
+from app.db.session import async_read_session, async_session
 
 security = HTTPBearer(
     scheme_name="JWT",
@@ -17,21 +23,39 @@ security = HTTPBearer(
     auto_error=True,
 )
 
+# Кэш пользователей для get_current_user: id -> значения колонок User.
+# Кэш локален для процесса, поэтому после изменения пользователя в другом
+# процессе данные могут устареть не больше чем на USER_CACHE_TTL_SECONDS.
+user_cache: TTLCache[dict] = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+)
+
+# Пользователи, недавно записавшие что-то в основную базу: их чтение
+# не идет на реплику, пока она может отставать
+recent_writers: TTLCache[bool] = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.READ_YOUR_WRITES_SECONDS,
+)
+
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         try:
             yield session
         finally:
             await session.close()
+            user_id = getattr(request.state, "user_id", None)
+            if session.info.get("committed") and user_id is not None:
+                recent_writers.set(user_id, True)
 
 
 async def get_s3_client():
-    async with await s3_client.get_client() as client:
-        yield client
+    return s3_client.client
 
 
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
 ) -> User:
@@ -53,12 +77,41 @@ async def get_current_user(
     except ValueError:
         raise credentials_exception
 
+    request.state.user_id = user_id_int
+    cached = user_cache.get(user_id_int)
+    if cached is not None:
+        user = User(**cached)
+        make_transient_to_detached(user)
+        return user
+
     user = await crud_user.user.get(db, id=user_id_int)
     if user is None:
         raise credentials_exception
+    user_cache.set(
+        user_id_int,
+        {column.key: getattr(user, column.key) for column in inspect(User).column_attrs}
+    )
     return user
 
 
+async def get_read_db(
+    current_user: User = Depends(get_current_user)
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для эндпоинтов только для чтения: идет на реплику, если она
+    задана и пользователь не делал записей последние READ_YOUR_WRITES_SECONDS.
+    """
+    if recent_writers.get(current_user.id):
+        session_factory = async_session
+    else:
+        session_factory = async_read_session
+    async with session_factory() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
 async def get_current_superuser(
         current_user: User = Depends(get_current_user),
 ) -> User:
@@ -68,3 +121,18 @@ async def get_current_superuser(
             detail="The user doesn't have enough privileges",
         )
     return current_user
+
+
+async def limit_uploads(current_user: User = Depends(get_current_user)) -> None:
+    """
+    Ограничивает частоту загрузок пользователя и не пускает новые,
+    пока предыдущие превышают допустимую скорость.
+    """
+    retry_after = upload_limiter.admit(current_user.id)
+    if retry_after:
+        upload_rejections.inc("rate_limit")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many uploads, retry later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
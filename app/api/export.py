@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Callable, Sequence
+
+from sqlalchemy.engine import Row
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def ndjson_chunk(columns: Sequence[str], rows: Sequence[Row]) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=json_default, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def csv_chunk(columns: Sequence[str], rows: Sequence[Row]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue()
+
+
+async def encode_rows(
+    export_format: str,
+    columns: Sequence[str],
+    chunks: AsyncIterator[Sequence[Row]]
+) -> AsyncIterator[bytes]:
+    """
+    Кодирует порции строк в NDJSON или CSV (с заголовком). Каждая порция
+    отдается одним куском, чтобы не писать в сокет по строке.
+    """
+    encode: Callable[[Sequence[str], Sequence[Row]], str] = (
+        ndjson_chunk if export_format == "ndjson" else csv_chunk
+    )
+    if export_format == "csv":
+        yield csv_chunk([], [columns]).encode()
+    async for rows in chunks:
+        yield encode(columns, rows).encode()
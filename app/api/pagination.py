@@ -0,0 +1,129 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple, Union
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy.engine import Row
+
+from app.db.models import AudioFile, User
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Кодирует ключ последней строки страницы в непрозрачный курсор.
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    if not isinstance(values, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values
+
+
+def audio_cursor(audio_file: Union[AudioFile, Row]) -> str:
+    return encode_cursor(audio_file.created_at.isoformat(), audio_file.id)
+
+
+def parse_audio_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if cursor is None:
+        return None
+    values = decode_cursor(cursor)
+    try:
+        created_at, id = values
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def search_cursor(row: Row) -> str:
+    return encode_cursor(row.rank, row.id)
+
+
+def parse_search_cursor(cursor: Optional[str]) -> Optional[Tuple[float, int]]:
+    if cursor is None:
+        return None
+    values = decode_cursor(cursor)
+    try:
+        rank, id = values
+        return float(rank), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def user_cursor(user: Union[User, Row]) -> str:
+    return encode_cursor(user.id)
+
+
+def parse_user_cursor(cursor: Optional[str]) -> Optional[int]:
+    if cursor is None:
+        return None
+    values = decode_cursor(cursor)
+    try:
+        (id,) = values
+        return int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def user_stats_cursor(sort_by: str):
+    def cursor_for(row: Row) -> str:
+        value = getattr(row, sort_by)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        # Поле сортировки входит в курсор, чтобы его нельзя было применить к другой сортировке
+        return encode_cursor(sort_by, value, row.id)
+    return cursor_for
+
+
+def parse_user_stats_cursor(cursor: Optional[str], sort_by: str) -> Optional[Tuple[Any, int]]:
+    if cursor is None:
+        return None
+    values = decode_cursor(cursor)
+    try:
+        cursor_sort_by, value, id = values
+        if cursor_sort_by != sort_by:
+            raise ValueError(cursor_sort_by)
+        if sort_by == "last_upload_at":
+            value = datetime.fromisoformat(value) if value is not None else None
+        else:
+            value = int(value)
+        return value, int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def set_next_cursor(response: Response, items: list, limit: int, cursor_for) -> None:
+    """
+    Передает курсор следующей страницы в заголовке X-Next-Cursor,
+    если страница заполнена полностью.
+    """
+    if items and len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_for(items[-1])
@@ -0,0 +1,64 @@
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import upload_rejections
+from app.crud.crud_usage import usage as crud_usage
+
+
+def quota_exceeded() -> HTTPException:
+    upload_rejections.inc("quota")
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail="Storage quota exceeded"
+    )
+
+
+async def check_storage_quota(
+    db: AsyncSession,
+    user_id: int,
+    *,
+    size_bytes: int = 0,
+    files: int = 1,
+    lock: bool = False
+) -> Optional[int]:
+    """
+    Проверяет до загрузки в MinIO, что у пользователя хватит квоты
+    еще на files файлов общим размером size_bytes. Читает одну строку
+    user_usage по первичному ключу.
+    Проверка до загрузки мягкая: параллельные загрузки одного пользователя
+    могут пройти ее одновременно и вместе превысить квоту на размер
+    загружаемых сейчас файлов. С lock=True строка блокируется до конца
+    транзакции (SELECT ... FOR UPDATE), поэтому проверка перед записью
+    файла в той же транзакции точная.
+    Returns:
+        int | None: Сколько байтов оставалось до квоты (без учета size_bytes)
+            или None, если объем не ограничен
+    """
+    if settings.STORAGE_QUOTA_BYTES is None and settings.STORAGE_QUOTA_FILES is None:
+        return None
+    usage = await crud_usage.get(db, user_id, for_update=lock)
+    used_bytes, used_files = (usage.size_bytes, usage.files) if usage else (0, 0)
+    if settings.STORAGE_QUOTA_FILES is not None and used_files + files > settings.STORAGE_QUOTA_FILES:
+        raise quota_exceeded()
+    if settings.STORAGE_QUOTA_BYTES is None:
+        return None
+    remaining = settings.STORAGE_QUOTA_BYTES - used_bytes
+    if size_bytes > remaining:
+        raise quota_exceeded()
+    return remaining
+
+
+async def limit_stream(chunks: AsyncIterator[bytes], limit: Optional[int]) -> AsyncIterator[bytes]:
+    """
+    Обрывает поток с 413, как только он превысит limit байтов,
+    для загрузок, размер которых заранее неизвестен.
+    """
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if limit is not None and received > limit:
+            raise quota_exceeded()
+        yield chunk
@@ -0,0 +1,83 @@
+import hashlib
+from typing import Any, Optional, Sequence
+
+import orjson
+from fastapi import Response, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.engine import Row
+
+from app.core.s3 import s3_client
+from app.crud.crud_audio import audio as crud_audio
+from app.crud.crud_user import USER_PUBLIC_COLUMNS, USER_STATS_COLUMNS
+
+# Клиент может хранить список, но должен каждый раз сверять его по ETag
+LIST_CACHE_CONTROL = "private, no-cache"
+
+
+class ListResponse(ORJSONResponse):
+    """
+    Ответ для списков, собранных из строк базы. Маршрут возвращает его
+    сам, поэтому FastAPI не проверяет данные по response_model: модель
+    остается только для документации, а словари сразу пишутся orjson.
+    Время в UTC записывается с Z, как у pydantic, чтобы формат не зависел
+    от того, каким путем построен ответ.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+async def audio_files_public(rows: Sequence[Row], with_urls: bool = False) -> list[dict]:
+    """
+    Готовит список файлов для ответа из строк с колонками
+    CRUDAudio.PUBLIC_COLUMNS (лишние колонки в конце строки отбрасываются).
+    С with_urls=True добавляет download_url для каждого файла одним
+    пакетом подписанных ссылок.
+    """
+    columns = crud_audio.PUBLIC_COLUMNS
+    items = [dict(zip(columns, row), download_url=None) for row in rows]
+    if with_urls and items:
+        urls = await s3_client.get_file_urls(item["storage_path"] for item in items)
+        for item in items:
+            item["download_url"] = urls[item["storage_path"]]
+    return items
+
+
+def library_etag(user_id: int, version: int, **params: Any) -> str:
+    """
+    Слабый ETag списка файлов пользователя: версия библиотеки
+    и параметры запроса, от которых зависит ответ. Версию нужно читать
+    до самих файлов: если список изменится между запросами, ответ
+    получит устаревший ETag и клиент просто запросит его еще раз,
+    а не сохранит старые данные под новым ETag.
+    """
+    key = orjson.dumps([user_id, version, params], option=orjson.OPT_SORT_KEYS)
+    return f'W/"{version}-{hashlib.blake2b(key, digest_size=8).hexdigest()}"'
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": LIST_CACHE_CONTROL}
+    )
+
+
+def set_etag(response: Response, etag: Optional[str]) -> None:
+    if etag is not None:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = LIST_CACHE_CONTROL
+
+
+def users_public(rows: Sequence[Row], with_stats: bool = False) -> list[dict]:
+    """
+    Готовит список пользователей для ответа из строк с колонками
+    USER_PUBLIC_COLUMNS и, при with_stats=True, USER_STATS_COLUMNS.
+    """
+    columns = [column.key for column in USER_PUBLIC_COLUMNS]
+    stats_columns = [column.key for column in USER_STATS_COLUMNS]
+    items = []
+    for row in rows:
+        item = dict(zip(columns, row))
+        item["stats"] = dict(zip(stats_columns, row[len(columns):])) if with_stats else None
+        items.append(item)
+    return items
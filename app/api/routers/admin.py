@@ -1,11 +1,28 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Literal, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_superuser, get_db
+from app.api.deps import get_current_superuser, get_db, get_read_db, user_cache
+from app.api.export import EXPORT_MEDIA_TYPES, encode_rows
+from app.api.pagination import (
+    audio_cursor,
+    parse_audio_cursor,
+    parse_user_cursor,
+    parse_user_stats_cursor,
+    set_next_cursor,
+    user_cursor,
+    user_stats_cursor,
+)
+from app.api.responses import ListResponse, audio_files_public, users_public
+from app.core.cleanup import delete_user_objects
+from app.core.config import settings
 from app.crud.crud_user import user as crud_user
 from app.crud.crud_audio import audio as crud_audio
+from app.crud.crud_blob import blob as crud_blob
+from app.crud.crud_upload_session import upload_session as crud_upload_session
 from app.db.models import User
+from app.db.session import async_read_session
 from app.schemas.user import UserPublic, UserUpdate
 from app.schemas.audio import AudioFilePublic
 
@@ -14,20 +31,43 @@ router = APIRouter()
 
 @router.get("/users", response_model=List[UserPublic])
 async def get_users(
-    skip: int = 0,
-    limit: int = 100,
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    with_stats: bool = False,
+    sort_by: Literal["id", "files", "size_bytes", "last_upload_at"] = "id",
+    order: Literal["asc", "desc"] = "asc",
     current_user: User = Depends(get_current_superuser),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    users = await crud_user.get_multi(db, skip=skip, limit=limit)
-    return users
+    """
+    Возвращает пользователей постранично. С with_stats=true у каждого
+    пользователя есть stats: количество файлов, их размер и время последней
+    загрузки. Список можно сортировать по этим полям (sort_by, order);
+    курсор следующей страницы передается в заголовке X-Next-Cursor.
+    """
+    if not with_stats and sort_by == "id" and order == "asc":
+        rows = await crud_user.get_multi(db, after=parse_user_cursor(after), limit=limit)
+        response = ListResponse(users_public(rows))
+        set_next_cursor(response, rows, limit, user_cursor)
+        return response
+
+    rows = await crud_user.get_multi_with_stats(
+        db,
+        sort_by=sort_by,
+        descending=order == "desc",
+        after=parse_user_stats_cursor(after, sort_by),
+        limit=limit
+    )
+    response = ListResponse(users_public(rows, with_stats=with_stats))
+    set_next_cursor(response, rows, limit, user_stats_cursor(sort_by))
+    return response
 
 
 @router.get("/users/{user_id}", response_model=UserPublic)
 async def get_user(
     user_id: int,
     current_user: User = Depends(get_current_superuser),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     user = await crud_user.get(db, id=user_id)
     if not user:
@@ -52,32 +92,53 @@ async def update_user(
             detail="User not found"
         )
     user = await crud_user.update(db, db_obj=user, obj_in=user_update)
+    user_cache.invalidate(user_id)
     return user
 
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_superuser),
     db: AsyncSession = Depends(get_db)
 ):
+    """
+    Удаляет пользователя. Его файлы и сессии загрузки удаляет
+    ON DELETE CASCADE в базе, объекты в MinIO удаляются после ответа
+    """
     user = await crud_user.get(db, id=user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+    upload_sessions = await crud_upload_session.get_user_upload_sessions(db, user_id)
+    await crud_blob.release_user_blobs(db, user_id)
     await crud_user.remove(db, id=user_id)
+    user_cache.invalidate(user_id)
+    background_tasks.add_task(delete_user_objects, user_id, upload_sessions)
     return None
 
 
+@router.get("/cache/users")
+async def get_user_cache_stats(
+    current_user: User = Depends(get_current_superuser),
+):
+    """
+    Статистика кэша пользователей текущего процесса
+    """
+    return user_cache.stats
+
+
 @router.get("/users/{user_id}/audio", response_model=List[AudioFilePublic])
 async def get_user_audio_files(
     user_id: int,
-    skip: int = 0,
-    limit: int = 100,
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    with_urls: bool = False,
     current_user: User = Depends(get_current_superuser),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     user = await crud_user.get(db, id=user_id)
     if not user:
@@ -85,5 +146,37 @@ async def get_user_audio_files(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    audio_files = await crud_audio.get_user_audio_files(db, user_id=user_id, skip=skip, limit=limit)
-    return audio_files 
\ No newline at end of file
+    rows = await crud_audio.get_user_audio_files(
+        db, user_id=user_id, after=parse_audio_cursor(after), limit=limit
+    )
+    response = ListResponse(await audio_files_public(rows, with_urls=with_urls))
+    set_next_cursor(response, rows, limit, audio_cursor)
+    return response
+
+
+@router.get("/audio/export")
+async def export_audio_files(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    user_id: Optional[int] = None,
+    current_user: User = Depends(get_current_superuser),
+):
+    """
+    Выгружает все записи audio_files (или файлы одного пользователя)
+    в NDJSON или CSV. Строки читаются серверным курсором порциями
+    по EXPORT_CHUNK_SIZE и сразу отправляются клиенту, поэтому память
+    не растет с размером таблицы.
+    """
+    async def body():
+        # Сессия живет, пока идет ответ, поэтому она открывается здесь, а не в зависимости
+        async with async_read_session() as db:
+            chunks = crud_audio.stream_export_rows(
+                db, user_id=user_id, chunk_size=settings.EXPORT_CHUNK_SIZE
+            )
+            async for data in encode_rows(export_format, crud_audio.EXPORT_COLUMNS, chunks):
+                yield data
+
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="audio_files.{export_format}"'}
+    )
@@ -1,19 +1,55 @@
+import asyncio
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 from uuid import uuid4
-from fastapi import APIRouter, Depends, File, Form, UploadFile, HTTPException
+from typing import Optional
+
+from botocore.exceptions import BotoCoreError, ClientError
+from fastapi import APIRouter, Depends, File, Form, Header, UploadFile, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
 
-from app.api.deps import get_current_user, get_s3_client, get_db
+from app.api.deps import get_current_user, get_s3_client, get_db, get_read_db, limit_uploads
+from app.api.pagination import (
+    audio_cursor,
+    parse_audio_cursor,
+    parse_search_cursor,
+    search_cursor,
+    set_next_cursor,
+)
+from app.api.quota import check_storage_quota, limit_stream
+from app.api.responses import ListResponse, audio_files_public, library_etag, not_modified, set_etag
+from app.api.streaming import etag_matches, http_date, if_range_matches, iter_body, parse_range
+from app.core.audio_probe import ProbeBuffer, audio_prober
 from app.core.config import settings
-from app.crud import crud_audio
-from app.db.models import User
-from app.schemas.audio import AudioFilePublic
+from app.core.hashing import StreamHasher, hash_file
+from app.core.jobs import COMPUTE_PEAKS, PROBE_METADATA
+from app.core.metrics import record_upload
+from app.core.ratelimit import upload_limiter
+from app.core.s3 import blob_object_key, s3_client as storage
+from app.core.waveform import PEAKS_HEADER, level_range, peaks_path, with_peaks
+from app.crud import crud_audio, crud_blob, crud_pending_upload, crud_upload_session, crud_usage
+from app.db.models import UploadSession, User
+from app.schemas.audio import (
+    AudioFileBatchResult,
+    AudioFileBulkDelete,
+    AudioFilePublic,
+    UploadSessionCreate,
+    UploadSessionPublic,
+    UploadUrlPublic,
+    UploadUrlRequest,
+)
 
 router = APIRouter()
 
 
-@router.post("/upload", response_model=AudioFilePublic)
+@router.post("/upload", response_model=AudioFilePublic, dependencies=[Depends(limit_uploads)])
 async def upload_audio(
+    request: Request,
     file: UploadFile = File(...),
     filename: str = Form(None),
     current_user: User = Depends(get_current_user),
@@ -26,29 +62,877 @@ async def upload_audio(
             detail="File must be an audio file"
         )
 
-    file_extension = Path(file.filename).suffix
+    await check_storage_quota(db, current_user.id, size_bytes=file.size)
+    # Тело уже принято, остается учесть его в скорости загрузки пользователя
+    upload_limiter.consume(current_user.id, file.size)
+
+    s3_object_key = blob_object_key(file.filename)
+
+    head = await file.read(settings.PROBE_HEAD_BYTES)
+    await file.seek(max(file.size - settings.PROBE_TAIL_BYTES, 0))
+    tail = await file.read()
+    await file.seek(0)
+    audio_metadata = await audio_prober.probe(head, tail, file.size)
+
+    # Если такое содержимое уже хранится, повторно в MinIO его не загружаем
+    sha256, size = await run_in_threadpool(hash_file, file.file)
+    existing_blob = await crud_blob.blob.get(db, sha256)
+    if existing_blob is None:
+        await s3_client.upload_fileobj(
+            file.file,
+            settings.MINIO_BUCKET_NAME,
+            s3_object_key
+        )
+
+    audio_file = await crud_audio.audio.create_deduplicated_audio_file(
+        db,
+        user_id=current_user.id,
+        filename=filename or file.filename,
+        storage_path=s3_object_key,
+        sha256=sha256,
+        size_bytes=size,
+        audio_metadata=audio_metadata,
+        jobs=[COMPUTE_PEAKS]
+    )
+
+    if audio_file.storage_path != s3_object_key and existing_blob is None:
+        # Такой же файл параллельно загрузил кто-то другой
+        await storage.delete_file(s3_object_key)
+    elif audio_file.storage_path == s3_object_key and existing_blob is not None:
+        # Существующий blob успели удалить, загружаем содержимое заново
+        await file.seek(0)
+        await s3_client.upload_fileobj(
+            file.file,
+            settings.MINIO_BUCKET_NAME,
+            s3_object_key
+        )
+
+    record_upload("multipart", size, request.state.started_at)
+    return audio_file
+
+
+@router.post("/upload/stream", response_model=AudioFilePublic, dependencies=[Depends(limit_uploads)])
+async def upload_audio_stream(
+    request: Request,
+    filename: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Загружает аудио файл, переданный телом запроса, напрямую в MinIO
+    через multipart upload без промежуточного сохранения на диск
+    """
+    content_type = request.headers.get('content-type', '')
+    if not content_type.startswith('audio/'):
+        raise HTTPException(
+            status_code=400,
+            detail="File must be an audio file"
+        )
+
+    content_length = request.headers.get('content-length', '')
+    remaining_quota = await check_storage_quota(
+        db, current_user.id, size_bytes=int(content_length) if content_length.isdigit() else 0
+    )
+    # Не держим соединение из пула в открытой транзакции, пока принимаем тело
+    await db.commit()
+    chunks = upload_limiter.throttle(
+        current_user.id, limit_stream(request.stream(), remaining_quota)
+    )
+
+    s3_object_key = blob_object_key(filename)
+
+    probe_buffer = ProbeBuffer()
+    hasher = StreamHasher()
+    try:
+        await storage.upload_stream(
+            probe_buffer.wrap(hasher.wrap(chunks)),
+            s3_object_key,
+            content_type=content_type
+        )
+    except ClientDisconnect:
+        raise HTTPException(
+            status_code=400,
+            detail="Client disconnected during upload"
+        )
+    audio_metadata = await audio_prober.probe_buffer(probe_buffer)
+
+    audio_file = await crud_audio.audio.create_deduplicated_audio_file(
+        db,
+        user_id=current_user.id,
+        filename=filename,
+        storage_path=s3_object_key,
+        sha256=hasher.hexdigest,
+        size_bytes=hasher.size,
+        audio_metadata=audio_metadata,
+        jobs=[COMPUTE_PEAKS]
+    )
+
+    if audio_file.storage_path != s3_object_key:
+        # Такое содержимое уже хранится, загруженная копия не нужна
+        await storage.delete_file(s3_object_key)
+
+    record_upload("stream", hasher.size, request.state.started_at)
+    return audio_file
+
+
+@router.post("/upload/batch", response_model=list[AudioFileBatchResult], dependencies=[Depends(limit_uploads)])
+async def upload_audio_batch(
+    request: Request,
+    files: list[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user),
+    s3_client = Depends(get_s3_client),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Загружает несколько аудио файлов одним запросом. Файлы обрабатываются
+    и загружаются в MinIO параллельно, не более BATCH_UPLOAD_CONCURRENCY
+    одновременно, а записи о них создаются в одной транзакции.
+    Результат возвращается для каждого файла в порядке запроса: ошибка
+    в одном файле не мешает загрузке остальных.
+    """
+    if len(files) > settings.BATCH_UPLOAD_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BATCH_UPLOAD_MAX_FILES} files per batch"
+        )
+
+    semaphore = asyncio.Semaphore(settings.BATCH_UPLOAD_CONCURRENCY)
+    errors: dict[int, str] = {}
+
+    async def prepare(index: int) -> Optional[dict]:
+        file = files[index]
+        async with semaphore:
+            try:
+                head = await file.read(settings.PROBE_HEAD_BYTES)
+                await file.seek(max(file.size - settings.PROBE_TAIL_BYTES, 0))
+                tail = await file.read()
+                await file.seek(0)
+                audio_metadata = await audio_prober.probe(head, tail, file.size)
+                sha256, size = await run_in_threadpool(hash_file, file.file)
+            except OSError as e:
+                print(f"Error reading uploaded file: {e}")
+                errors[index] = "Failed to read file"
+                return None
+        return {
+            "filename": file.filename,
+            "storage_path": blob_object_key(file.filename),
+            "sha256": sha256,
+            "size_bytes": size,
+            "audio_metadata": audio_metadata,
+        }
+
+    async def upload(index: int) -> Optional[str]:
+        async with semaphore:
+            try:
+                await s3_client.upload_fileobj(
+                    files[index].file,
+                    settings.MINIO_BUCKET_NAME,
+                    prepared[index]["storage_path"]
+                )
+            except (ClientError, BotoCoreError, OSError) as e:
+                print(f"Error uploading file to S3: {e}")
+                return "Failed to store file"
+        return None
+
+    audio_indexes = []
+    for index, file in enumerate(files):
+        if file.content_type and file.content_type.startswith('audio/'):
+            audio_indexes.append(index)
+        else:
+            errors[index] = "File must be an audio file"
+    batch_size = sum(files[index].size for index in audio_indexes)
+    await check_storage_quota(
+        db, current_user.id, size_bytes=batch_size, files=len(audio_indexes)
+    )
+    upload_limiter.consume(current_user.id, batch_size)
+    prepared = {
+        index: item
+        for index, item in zip(
+            audio_indexes,
+            await asyncio.gather(*(prepare(index) for index in audio_indexes))
+        )
+        if item is not None
+    }
+
+    # Одинаковое содержимое загружаем в MinIO один раз и только если его еще нет
+    existing_blobs = await crud_blob.blob.get_many(
+        db, {item["sha256"] for item in prepared.values()}
+    )
+    first_by_sha256: dict[str, int] = {}
+    for index, item in prepared.items():
+        first_by_sha256.setdefault(item["sha256"], index)
+    uploaded = [
+        index for sha256, index in first_by_sha256.items()
+        if sha256 not in existing_blobs
+    ]
+    storage_paths = [prepared[index]["storage_path"] for index in uploaded]
+    try:
+        # Ждем все загрузки, даже если одна упала, чтобы удалить уже загруженное
+        upload_errors = await asyncio.gather(
+            *(upload(index) for index in uploaded), return_exceptions=True
+        )
+        for error in upload_errors:
+            if isinstance(error, BaseException):
+                raise error
+        failed_sha256 = set()
+        for index, error in zip(uploaded, upload_errors):
+            if error:
+                failed_sha256.add(prepared[index]["sha256"])
+        uploaded = [index for index in uploaded if prepared[index]["sha256"] not in failed_sha256]
+        for index, item in list(prepared.items()):
+            if item["sha256"] in failed_sha256:
+                errors[index] = "Failed to store file"
+                del prepared[index]
+
+        audio_files = await crud_audio.audio.create_deduplicated_audio_files(
+            db,
+            user_id=current_user.id,
+            files=list(prepared.values()),
+            jobs=[COMPUTE_PEAKS]
+        )
+    except Exception:
+        await storage.delete_files(storage_paths)
+        raise
+    created = dict(zip(prepared, audio_files))
+
+    for index in first_by_sha256.values():
+        if index not in created:
+            continue
+        stored = created[index].storage_path == prepared[index]["storage_path"]
+        if index in uploaded and not stored:
+            # Такой же файл параллельно загрузил кто-то другой
+            await storage.delete_file(prepared[index]["storage_path"])
+        elif index not in uploaded and stored:
+            # Существующий blob успели удалить, загружаем содержимое заново
+            await files[index].seek(0)
+            await s3_client.upload_fileobj(
+                files[index].file,
+                settings.MINIO_BUCKET_NAME,
+                prepared[index]["storage_path"]
+            )
+
+    record_upload(
+        "batch",
+        sum(item["size_bytes"] for item in prepared.values()),
+        request.state.started_at
+    )
+    return [
+        AudioFileBatchResult(
+            filename=file.filename,
+            audio_file=AudioFilePublic.model_validate(created[index]) if index in created else None,
+            error=errors.get(index)
+        )
+        for index, file in enumerate(files)
+    ]
+
+
+@router.post("/upload-url", response_model=UploadUrlPublic, dependencies=[Depends(limit_uploads)])
+async def create_upload_url(
+    upload_in: UploadUrlRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Выдает presigned URL для загрузки файла напрямую в MinIO.
+    После загрузки клиент должен вызвать POST /audio/{upload_id}/complete
+    """
+    if not upload_in.content_type.startswith('audio/'):
+        raise HTTPException(
+            status_code=400,
+            detail="File must be an audio file"
+        )
+    # Заявленный размер подписывается в URL, MinIO не примет объект другого размера
+    await check_storage_quota(db, current_user.id, size_bytes=upload_in.size_bytes)
+
+    file_extension = Path(upload_in.filename).suffix
     s3_object_key = f"user_{current_user.id}/{uuid4().hex}{file_extension}"
 
-    await s3_client.upload_fileobj(
-        file.file,
-        settings.MINIO_BUCKET_NAME,
-        s3_object_key
+    pending = await crud_pending_upload.pending_upload.create_pending_upload(
+        db,
+        user_id=current_user.id,
+        filename=upload_in.filename,
+        storage_path=s3_object_key,
+        content_type=upload_in.content_type,
+        expires_in=settings.PENDING_UPLOAD_TTL_SECONDS
+    )
+    url = await storage.get_upload_url(
+        s3_object_key,
+        upload_in.content_type,
+        upload_in.size_bytes,
+        expires_in=settings.PRESIGNED_UPLOAD_EXPIRE_SECONDS
+    )
+
+    return UploadUrlPublic(
+        upload_id=pending.id,
+        url=url,
+        headers={"Content-Type": upload_in.content_type, "Content-Length": str(upload_in.size_bytes)},
+        expires_at=pending.expires_at
+    )
+
+
+@router.post("/{upload_id}/complete", response_model=AudioFilePublic)
+async def complete_upload(
+    upload_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Подтверждает загрузку по presigned URL и создает запись об аудио файле
+    """
+    # Блокировка строки не дает двум подтверждениям создать два файла
+    # и дважды учесть место
+    pending = await crud_pending_upload.pending_upload.get_pending_upload(
+        db, id=upload_id, user_id=current_user.id, lock=True
     )
+    if not pending:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
 
-    audio_file = await crud_audio.audio.create_audio_file(
+    head = await storage.head_file(pending.storage_path)
+    if head is None or head['ContentLength'] == 0:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="File has not been uploaded"
+        )
+
+    # Строка user_usage остается заблокированной до записи файла, поэтому
+    # параллельные подтверждения не превысят квоту вместе
+    try:
+        await check_storage_quota(db, current_user.id, size_bytes=head['ContentLength'], lock=True)
+    except HTTPException:
+        storage_path = pending.storage_path
+        await db.rollback()
+        await storage.delete_file(storage_path)
+        raise
+
+    # Метаданные определяет воркер, чтобы не скачивать объект в запросе
+    audio_file = await crud_pending_upload.pending_upload.complete_pending_upload(
         db,
+        pending_upload=pending,
+        audio_metadata={"size_bytes": head['ContentLength']},
+        jobs=[PROBE_METADATA, COMPUTE_PEAKS]
+    )
+
+    return audio_file
+
+
+async def get_locked_upload_session(
+    db: AsyncSession, session_id: str, user_id: int
+) -> UploadSession:
+    try:
+        upload_session = await crud_upload_session.upload_session.get_upload_session(
+            db, id=session_id, user_id=user_id, lock=True
+        )
+    except OperationalError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload session is busy"
+        )
+    if not upload_session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found"
+        )
+    if upload_session.locked_until is not None and upload_session.locked_until > datetime.now(timezone.utc):
+        # Сессию сейчас дописывает PATCH, он держит ее без блокировки строки
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload session is busy"
+        )
+    return upload_session
+
+
+async def claim_upload_session(
+    db: AsyncSession, session_id: str, user_id: int
+) -> UploadSession:
+    upload_session = await crud_upload_session.upload_session.claim(
+        db, id=session_id, user_id=user_id, lock_seconds=settings.UPLOAD_SESSION_LOCK_SECONDS
+    )
+    if upload_session is not None:
+        return upload_session
+    if await crud_upload_session.upload_session.get_upload_session(db, id=session_id, user_id=user_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload session is busy"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Upload session not found"
+    )
+
+
+@router.post(
+    "/sessions",
+    response_model=UploadSessionPublic,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_uploads)]
+)
+async def create_upload_session(
+    session_in: UploadSessionCreate,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Создает сессию возобновляемой загрузки. Файл передается частями через
+    PATCH /audio/sessions/{session_id} с заголовком Upload-Offset
+    """
+    if not session_in.content_type.startswith('audio/'):
+        raise HTTPException(
+            status_code=400,
+            detail="File must be an audio file"
+        )
+    await check_storage_quota(db, current_user.id, size_bytes=session_in.length or 0)
+
+    file_extension = Path(session_in.filename).suffix
+    s3_object_key = f"user_{current_user.id}/{uuid4().hex}{file_extension}"
+    s3_upload_id = await storage.create_multipart_upload(s3_object_key, session_in.content_type)
+
+    upload_session = await crud_upload_session.upload_session.create_upload_session(
+        db,
+        id=uuid4().hex,
         user_id=current_user.id,
-        filename=filename or file.filename,
-        storage_path=s3_object_key
+        filename=session_in.filename,
+        content_type=session_in.content_type,
+        storage_path=s3_object_key,
+        s3_upload_id=s3_upload_id,
+        length=session_in.length,
+        expires_in=settings.UPLOAD_SESSION_TTL_SECONDS
+    )
+    response.headers["Upload-Offset"] = "0"
+    return upload_session
+
+
+@router.get("/sessions/{session_id}", response_model=UploadSessionPublic)
+async def get_upload_session(
+    session_id: str,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Возвращает текущее смещение сессии, с которого нужно продолжить загрузку
+    """
+    upload_session = await crud_upload_session.upload_session.get_upload_session(
+        db, id=session_id, user_id=current_user.id
+    )
+    if not upload_session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found"
+        )
+    response.headers["Upload-Offset"] = str(upload_session.offset)
+    response.headers["Cache-Control"] = "no-store"
+    return upload_session
+
+
+@router.patch(
+    "/sessions/{session_id}",
+    response_model=UploadSessionPublic,
+    dependencies=[Depends(limit_uploads)]
+)
+async def upload_session_chunk(
+    session_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Дописывает тело запроса в сессию начиная с Upload-Offset.
+    Полные части сразу загружаются в multipart upload, остаток
+    сохраняется отдельным объектом до следующего запроса. При обрыве
+    соединения принятые байты сохраняются, и загрузку можно продолжить
+    """
+    # Сессия помечается занятой короткой транзакцией: тело и части
+    # загружаются без открытой транзакции и без занятого соединения из пула
+    upload_session = await claim_upload_session(db, session_id, current_user.id)
+    try:
+        if upload_offset != upload_session.offset:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Upload offset mismatch",
+                headers={"Upload-Offset": str(upload_session.offset)}
+            )
+
+        remaining_quota = await check_storage_quota(db, current_user.id)
+        await db.commit()
+        if remaining_quota is not None:
+            remaining_quota -= upload_session.offset
+        chunks = upload_limiter.throttle(
+            current_user.id, limit_stream(request.stream(), remaining_quota)
+        )
+
+        part_size = settings.S3_MULTIPART_PART_SIZE
+        lock_seconds = settings.UPLOAD_SESSION_LOCK_SECONDS
+        buffer = bytearray()
+        if upload_session.tail_size:
+            buffer += await storage.download_bytes(upload_session.tail_path)
+        writer = storage.multipart_writer(
+            upload_session.storage_path,
+            upload_session.s3_upload_id,
+            next_part_number=len(upload_session.parts) + 1
+        )
+        offset = upload_session.offset
+        parts_size = upload_session.parts_size
+        renew_at = time.monotonic() + lock_seconds / 3
+
+        try:
+            try:
+                async for chunk in chunks:
+                    offset += len(chunk)
+                    if upload_session.length is not None and offset > upload_session.length:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail="Chunk exceeds declared upload length"
+                        )
+                    buffer += chunk
+                    while len(buffer) >= part_size:
+                        body = bytes(buffer[:part_size])
+                        del buffer[:part_size]
+                        await writer.write_part(body)
+                        parts_size += part_size
+                    if time.monotonic() >= renew_at:
+                        if not await crud_upload_session.upload_session.renew(
+                            db, upload_session=upload_session, lock_seconds=lock_seconds
+                        ):
+                            raise HTTPException(
+                                status_code=status.HTTP_409_CONFLICT,
+                                detail="Upload session is busy"
+                            )
+                        renew_at = time.monotonic() + lock_seconds / 3
+            except ClientDisconnect:
+                pass
+            parts = await writer.flush()
+        except BaseException:
+            await writer.cancel()
+            raise
+
+        if offset != upload_session.offset:
+            if buffer:
+                await storage.upload_bytes(bytes(buffer), upload_session.tail_path)
+            elif upload_session.tail_size:
+                await storage.delete_file(upload_session.tail_path)
+    except BaseException:
+        await crud_upload_session.upload_session.release(db, upload_session=upload_session)
+        raise
+
+    upload_session = await crud_upload_session.upload_session.record_chunk(
+        db,
+        upload_session=upload_session,
+        parts=parts,
+        parts_size=parts_size,
+        offset=offset,
+        expires_in=settings.UPLOAD_SESSION_TTL_SECONDS
+    )
+    if upload_session is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload session is busy"
+        )
+    record_upload("session", offset - upload_offset, request.state.started_at)
+    response.headers["Upload-Offset"] = str(upload_session.offset)
+    return upload_session
+
+
+@router.post("/sessions/{session_id}/complete", response_model=AudioFilePublic)
+async def complete_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Завершает сессию: собирает объект из частей и создает запись об аудио файле
+    """
+    upload_session = await get_locked_upload_session(db, session_id, current_user.id)
+    if upload_session.length is not None and upload_session.offset != upload_session.length:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload is not finished",
+            headers={"Upload-Offset": str(upload_session.offset)}
+        )
+
+    parts = list(upload_session.parts)
+    if upload_session.tail_size or not parts:
+        tail = b""
+        if upload_session.tail_size:
+            tail = await storage.download_bytes(upload_session.tail_path)
+        writer = storage.multipart_writer(
+            upload_session.storage_path,
+            upload_session.s3_upload_id,
+            next_part_number=len(parts) + 1
+        )
+        await writer.write_part(tail)
+        parts += await writer.flush()
+
+    await storage.complete_multipart_upload(
+        upload_session.storage_path, upload_session.s3_upload_id, parts
     )
+    if upload_session.tail_size:
+        await storage.delete_file(upload_session.tail_path)
+
+    storage_path = upload_session.storage_path
+    try:
+        audio_file = await crud_upload_session.upload_session.complete_upload_session(
+            db,
+            upload_session=upload_session,
+            audio_metadata={"size_bytes": upload_session.offset},
+            jobs=[PROBE_METADATA, COMPUTE_PEAKS]
+        )
+    except Exception:
+        # Собранный объект без записи в базе никому не нужен
+        await storage.delete_file(storage_path)
+        raise
 
     return audio_file
 
 
+@router.get("/{audio_id}/stream")
+async def stream_audio(
+    audio_id: int,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Отдает аудио файл потоком из MinIO. Поддерживает Range (один диапазон),
+    If-None-Match и If-Range
+    """
+    audio_file = await crud_audio.audio.get_audio_file(
+        db, id=audio_id, user_id=current_user.id
+    )
+    if not audio_file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Audio file not found"
+        )
+
+    byte_range = parse_range(range_header)
+    # Без условных заголовков обходимся одним запросом к MinIO
+    if if_none_match is not None or (if_range is not None and byte_range):
+        head = await storage.head_file(audio_file.storage_path)
+        if head is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Audio file not found"
+            )
+        if if_none_match is not None and etag_matches(if_none_match, head['ETag']):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": head['ETag'], "Cache-Control": "private"}
+            )
+        if if_range is not None and not if_range_matches(if_range, head['ETag'], head['LastModified']):
+            byte_range = None
+
+    try:
+        s3_object = await storage.open_file(audio_file.storage_path, byte_range)
+    except ClientError as e:
+        error_code = e.response['Error']['Code']
+        if error_code in ('404', 'NoSuchKey'):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Audio file not found"
+            )
+        if error_code == 'InvalidRange':
+            size = audio_file.size_bytes
+            if size is None:
+                size = (await storage.head_file(audio_file.storage_path))['ContentLength']
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+        raise
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(s3_object['ContentLength']),
+        "ETag": s3_object['ETag'],
+        "Last-Modified": http_date(s3_object['LastModified']),
+        "Cache-Control": "private",
+    }
+    status_code = status.HTTP_200_OK
+    if byte_range and s3_object.get('ContentRange'):
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = s3_object['ContentRange']
+
+    return StreamingResponse(
+        iter_body(s3_object['Body']),
+        status_code=status_code,
+        media_type=s3_object.get('ContentType') or "application/octet-stream",
+        headers=headers
+    )
+
+
+@router.get("/{audio_id}/peaks")
+async def get_audio_peaks(
+    audio_id: int,
+    level: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Отдает пики для отрисовки волны: пары int8 (min, max) подряд.
+    level 0 самый подробный, каждый следующий уровень вдвое грубее.
+    Частота дискретизации и число сэмплов на пик передаются в заголовках
+    """
+    audio_file = await crud_audio.audio.get_audio_file(
+        db, id=audio_id, user_id=current_user.id
+    )
+    if not audio_file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Audio file not found"
+        )
+
+    path = peaks_path(audio_file.storage_path)
+    try:
+        header = PEAKS_HEADER.unpack(
+            await storage.download_range(path, f"bytes=0-{PEAKS_HEADER.size - 1}")
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Peaks are not ready"
+            )
+        raise
+    _, _, levels, _, sample_rate, samples_per_peak, _ = header
+    if level >= levels:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Level must be less than {levels}"
+        )
+
+    offset, length = level_range(header, level)
+    content = b""
+    if length:
+        content = await storage.download_range(path, f"bytes={offset}-{offset + length - 1}")
+    return Response(
+        content=content,
+        media_type="application/octet-stream",
+        headers={
+            "X-Peaks-Levels": str(levels),
+            "X-Peaks-Sample-Rate": str(sample_rate),
+            "X-Peaks-Samples-Per-Peak": str(samples_per_peak << level),
+            "Cache-Control": "private, max-age=86400",
+        }
+    )
+
+
+@router.delete("/{audio_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_audio(
+    audio_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    audio_file = await crud_audio.audio.delete_audio_file(
+        db, id=audio_id, user_id=current_user.id
+    )
+    if not audio_file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Audio file not found"
+        )
+    if audio_file.blob_sha256 is None:
+        await storage.delete_files(with_peaks([audio_file.storage_path]))
+    return None
+
+
+@router.delete("/", response_model=AudioFileBulkDelete)
+async def delete_audio_files(
+    ids: list[int] = Query(..., max_length=1000),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Удаляет несколько файлов пользователя одним запросом.
+    Отсутствующие и чужие id возвращаются в not_found
+    """
+    audio_files = await crud_audio.audio.delete_audio_files(
+        db, ids=ids, user_id=current_user.id
+    )
+    await storage.delete_files(with_peaks(
+        audio_file.storage_path for audio_file in audio_files
+        if audio_file.blob_sha256 is None
+    ))
+    deleted = {audio_file.id for audio_file in audio_files}
+    return AudioFileBulkDelete(
+        deleted=sorted(deleted),
+        not_found=sorted(set(ids) - deleted)
+    )
+
+
 @router.get("/", response_model=list[AudioFilePublic])
 async def get_audio_files(
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    with_urls: bool = False,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Возвращает файлы пользователя от новых к старым. Курсор следующей
+    страницы передается в заголовке X-Next-Cursor, его нужно передать в after.
+    С with_urls=true для каждого файла возвращается download_url.
+    Поддерживает If-None-Match (кроме with_urls=true: ссылки истекают)
+    """
+    etag = None
+    if not with_urls:
+        etag = library_etag(
+            current_user.id,
+            await crud_usage.usage.get_version(db, current_user.id),
+            after=after,
+            limit=limit
+        )
+        if if_none_match is not None and etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    rows = await crud_audio.audio.get_user_audio_files(
+        db, user_id=current_user.id, after=parse_audio_cursor(after), limit=limit
+    )
+    response = ListResponse(await audio_files_public(rows, with_urls=with_urls))
+    set_next_cursor(response, rows, limit, audio_cursor)
+    set_etag(response, etag)
+    return response
+
+
+@router.get("/search", response_model=list[AudioFilePublic])
+async def search_audio_files(
+    q: str = Query(..., min_length=1, max_length=200),
+    after: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    with_urls: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    audio_files = await crud_audio.audio.get_user_audio_files(db, user_id=current_user.id)
-    return audio_files
+    """
+    Ищет файлы пользователя по имени: подстрока или похожее написание.
+    Самые похожие идут первыми. Курсор следующей страницы передается
+    в заголовке X-Next-Cursor, его нужно передать в after вместе с тем же q.
+    Поддерживает If-None-Match, как GET /audio/
+    """
+    etag = None
+    if not with_urls:
+        etag = library_etag(
+            current_user.id,
+            await crud_usage.usage.get_version(db, current_user.id),
+            q=q,
+            after=after,
+            limit=limit
+        )
+        if if_none_match is not None and etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    rows = await crud_audio.audio.search_user_audio_files(
+        db, user_id=current_user.id, query=q, after=parse_search_cursor(after), limit=limit
+    )
+    response = ListResponse(await audio_files_public(rows, with_urls=with_urls))
+    set_next_cursor(response, rows, limit, search_cursor)
+    set_etag(response, etag)
+    return response
@@ -35,20 +35,17 @@ async def yandex_callback(
     # Получаем информацию о пользователе
     user_info = await yandex_oauth.get_user_info(access_token)
 
-    # Проверяем, существует ли пользователь
-    db_user = await user.get_by_yandex_id(db, user_info["id"])
+    # Находим пользователя или создаем его при первом входе
+    full_name = user_info.get("real_name", "")
+    last_name = full_name.split()[-1] if full_name and len(full_name.split()) > 1 else ""
 
-    if not db_user:
-        full_name = user_info.get("real_name", "")
-        last_name = full_name.split()[-1] if full_name and len(full_name.split()) > 1 else ""
-        
-        user_in = UserCreate(
-            yandex_id=user_info["id"],
-            email=user_info["default_email"],
-            first_name=user_info["real_name"],
-            last_name=last_name
-        )
-        db_user = await user.create(db, obj_in=user_in)
+    user_in = UserCreate(
+        yandex_id=user_info["id"],
+        email=user_info["default_email"],
+        first_name=user_info["real_name"],
+        last_name=last_name
+    )
+    db_user = await user.upsert_by_yandex_id(db, obj_in=user_in)
 
     # Создаем JWT токены
     return Token(
@@ -0,0 +1,35 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import user_cache
+from app.core.metrics import registry
+from app.core.s3 import s3_client
+from app.db.session import engine, read_engine
+
+router = APIRouter()
+
+CACHES = {"user": user_cache, "presigned_url": s3_client.url_cache}
+ENGINES = {"primary": engine} if read_engine is engine else {"primary": engine, "replica": read_engine}
+
+
+def cache_stat(name: str):
+    return lambda: {(cache,): value.stats[name] for cache, value in CACHES.items()}
+
+
+def pool_stat(name: str):
+    return lambda: {(pool,): getattr(value.pool, name)() for pool, value in ENGINES.items()}
+
+
+registry.gauge("cache_entries", "Entries in in-process caches", cache_stat("size"), ("cache",))
+registry.gauge("cache_hits", "In-process cache hits since start", cache_stat("hits"), ("cache",))
+registry.gauge("cache_misses", "In-process cache misses since start", cache_stat("misses"), ("cache",))
+registry.gauge("db_pool_size", "Connections held by the pool", pool_stat("size"), ("pool",))
+registry.gauge("db_pool_checked_out", "Connections in use", pool_stat("checkedout"), ("pool",))
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """
+    Метрики процесса в формате Prometheus
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
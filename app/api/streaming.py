@@ -0,0 +1,64 @@
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import AsyncIterator, Optional
+
+from app.core.config import settings
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: Optional[str]) -> Optional[str]:
+    """
+    Проверяет заголовок Range. Поддерживается один диапазон байтов;
+    несколько диапазонов или некорректный заголовок игнорируются,
+    и отдается весь файл, как допускает RFC 9110.
+    Returns:
+        str | None: Нормализованный заголовок для S3 или None
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if start and end and int(end) < int(start):
+        return None
+    return f"bytes={start}-{end}"
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """
+    Слабое сравнение ETag для If-None-Match.
+    """
+    if header.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return etag.removeprefix("W/") in [candidate.removeprefix("W/") for candidate in candidates]
+
+
+def if_range_matches(header: str, etag: str, last_modified: datetime) -> bool:
+    """
+    Сильное сравнение для If-Range: ETag или точная дата изменения.
+    """
+    header = header.strip()
+    if header.startswith('"') or header.startswith("W/"):
+        return header == etag
+    return header == http_date(last_modified)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+async def iter_body(body, chunk_size: int = settings.STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Отдает тело ответа S3 кусками фиксированного размера, держа в памяти
+    не больше одного куска. Соединение с MinIO освобождается и при обрыве
+    соединения клиентом.
+    """
+    async with body:
+        async for chunk in body.iter_chunks(chunk_size):
+            yield chunk
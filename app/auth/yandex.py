@@ -1,3 +1,5 @@
+from typing import Optional
+
 import httpx
 from fastapi import HTTPException, status
 
@@ -11,38 +13,68 @@ class YandexOAuth:
         self.redirect_uri = settings.YANDEX_REDIRECT_URI
         self.token_url = settings.TOKEN_URL
         self.user_info_url = settings.USER_INFO_URL
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        """
+        Создает общий клиент (HTTP/2, если не отключен YANDEX_HTTP2) с keep-alive
+        соединениями к Яндексу.
+        Вызывается один раз в lifespan приложения.
+        """
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            http2=settings.YANDEX_HTTP2,
+            timeout=settings.YANDEX_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.YANDEX_MAX_CONNECTIONS,
+                keepalive_expiry=settings.YANDEX_KEEPALIVE_TIMEOUT
+            )
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Общий клиент, созданный в start().
+        """
+        if self._client is None:
+            raise RuntimeError("Yandex OAuth client is not started")
+        return self._client
 
     async def get_access_token(self, code: str) -> str:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.token_url,
-                data={
-                    "grant_type": "authorization_code",
-                    "code": code,
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                    "redirect_uri": self.redirect_uri,
-                }
+        response = await self.client.post(
+            self.token_url,
+            data={
+                "grant_type": "authorization_code",
+                "code": code,
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "redirect_uri": self.redirect_uri,
+            }
+        )
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Failed to get access token from Yandex"
             )
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Failed to get access token from Yandex"
-                )
-            return response.json()["access_token"]
+        return response.json()["access_token"]
 
     async def get_user_info(self, access_token: str) -> dict:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                self.user_info_url,
-                headers={"Authorization": f"OAuth {access_token}"}
+        response = await self.client.get(
+            self.user_info_url,
+            headers={"Authorization": f"OAuth {access_token}"}
+        )
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Failed to get user info from Yandex"
             )
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Failed to get user info from Yandex"
-                )
-            return response.json()
+        return response.json()
 
     def get_authorization_url(self) -> str:
         return (
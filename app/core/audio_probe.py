@@ -0,0 +1,347 @@
+"""
+Определение параметров аудио файла (длительность, кодек, частота
+дискретизации, каналы, битрейт) по первым и последним байтам файла,
+без скачивания его целиком. Поддерживаются WAV, MP3, FLAC, OGG и M4A.
+
+Разбор выполняется в ProcessPoolExecutor, чтобы не блокировать event loop.
+"""
+import asyncio
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Optional
+
+from app.core.config import settings
+
+MP3_BITRATES = {
+    # (версия MPEG 1, слой) -> битрейты в кбит/с по индексу
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG 1
+    2: [22050, 24000, 16000],  # MPEG 2
+    0: [11025, 12000, 8000],   # MPEG 2.5
+}
+
+
+def empty_metadata(size: int) -> dict:
+    return {
+        "size_bytes": size,
+        "duration": None,
+        "codec": None,
+        "sample_rate": None,
+        "channels": None,
+        "bitrate": None,
+    }
+
+
+def probe_wav(head: bytes, size: int) -> Optional[dict]:
+    if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        return None
+    metadata = empty_metadata(size)
+    position = 12
+    byte_rate = 0
+    while position + 8 <= len(head):
+        chunk_id = head[position:position + 4]
+        chunk_size = struct.unpack_from("<I", head, position + 4)[0]
+        body = position + 8
+        if chunk_id == b"fmt " and body + 16 <= len(head):
+            audio_format, channels, sample_rate, byte_rate = struct.unpack_from("<HHII", head, body)
+            metadata["codec"] = {1: "pcm", 3: "pcm_float", 0xFFFE: "pcm"}.get(audio_format, "wav")
+            metadata["channels"] = channels
+            metadata["sample_rate"] = sample_rate
+            metadata["bitrate"] = byte_rate * 8
+        elif chunk_id == b"data":
+            if byte_rate:
+                data_size = min(chunk_size, size - body)
+                metadata["duration"] = data_size / byte_rate
+            break
+        position = body + chunk_size + (chunk_size & 1)
+    return metadata
+
+
+def parse_mp3_frame(header: bytes) -> Optional[dict]:
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = 4 - ((header[1] >> 1) & 0x03)
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    sample_rate = MP3_SAMPLE_RATES[version][sample_rate_index]
+    if layer == 1:
+        samples = 384
+    elif layer == 3 and not mpeg1:
+        samples = 576
+    else:
+        samples = 1152
+    return {
+        "mpeg1": mpeg1,
+        "layer": layer,
+        "bitrate": MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000,
+        "sample_rate": sample_rate,
+        "channels": 1 if header[3] >> 6 == 3 else 2,
+        "samples": samples,
+    }
+
+
+def probe_mp3(head: bytes, tail: bytes, size: int) -> Optional[dict]:
+    position = 0
+    if head[:3] == b"ID3" and len(head) >= 10:
+        tag_size = 0
+        for byte in head[6:10]:
+            tag_size = (tag_size << 7) | (byte & 0x7F)
+        position = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+    elif not head[:2] or head[0] != 0xFF:
+        return None
+
+    frame = None
+    # После ID3 тега допускается немного мусора перед первым фреймом
+    search_end = min(len(head) - 4, position + 4096)
+    while position <= search_end:
+        frame = parse_mp3_frame(head[position:position + 4])
+        if frame:
+            break
+        position += 1
+    if not frame:
+        return None
+
+    metadata = empty_metadata(size)
+    metadata["codec"] = "mp3" if frame["layer"] == 3 else f"mp{frame['layer']}"
+    metadata["sample_rate"] = frame["sample_rate"]
+    metadata["channels"] = frame["channels"]
+
+    audio_size = size - position
+    if tail[-128:-125] == b"TAG":
+        audio_size -= 128
+
+    # Заголовок Xing/Info (VBR) содержит точное число фреймов
+    if frame["mpeg1"]:
+        side_info = 32 if frame["channels"] == 2 else 17
+    else:
+        side_info = 17 if frame["channels"] == 2 else 9
+    xing = position + 4 + side_info
+    frames = None
+    if head[xing:xing + 4] in (b"Xing", b"Info") and len(head) >= xing + 12:
+        flags = struct.unpack_from(">I", head, xing + 4)[0]
+        if flags & 0x01:
+            frames = struct.unpack_from(">I", head, xing + 8)[0]
+    elif head[position + 36:position + 40] == b"VBRI" and len(head) >= position + 54:
+        frames = struct.unpack_from(">I", head, position + 50)[0]
+
+    if frames:
+        metadata["duration"] = frames * frame["samples"] / frame["sample_rate"]
+        metadata["bitrate"] = int(audio_size * 8 / metadata["duration"]) if metadata["duration"] else None
+    else:
+        metadata["bitrate"] = frame["bitrate"]
+        metadata["duration"] = audio_size * 8 / frame["bitrate"]
+    return metadata
+
+
+def probe_flac(head: bytes, size: int) -> Optional[dict]:
+    if head[:4] != b"fLaC" or len(head) < 8 + 18:
+        return None
+    metadata = empty_metadata(size)
+    metadata["codec"] = "flac"
+    # Первый блок метаданных всегда STREAMINFO
+    info = head[8:8 + 18]
+    packed = int.from_bytes(info[10:18], "big")
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x07) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    metadata["sample_rate"] = sample_rate
+    metadata["channels"] = channels
+    if sample_rate and total_samples:
+        metadata["duration"] = total_samples / sample_rate
+        metadata["bitrate"] = int(size * 8 / metadata["duration"])
+    return metadata
+
+
+def probe_ogg(head: bytes, tail: bytes, size: int) -> Optional[dict]:
+    if head[:4] != b"OggS" or len(head) < 28:
+        return None
+    segments = head[26]
+    packet = head[27 + segments:27 + segments + 64]
+    metadata = empty_metadata(size)
+    rate = None
+    pre_skip = 0
+    if packet[:7] == b"\x01vorbis" and len(packet) >= 16:
+        metadata["codec"] = "vorbis"
+        metadata["channels"] = packet[11]
+        metadata["sample_rate"] = rate = struct.unpack_from("<I", packet, 12)[0]
+    elif packet[:8] == b"OpusHead" and len(packet) >= 16:
+        metadata["codec"] = "opus"
+        metadata["channels"] = packet[9]
+        pre_skip = struct.unpack_from("<H", packet, 10)[0]
+        metadata["sample_rate"] = struct.unpack_from("<I", packet, 12)[0] or 48000
+        # Гранулы Opus всегда считаются в 48 кГц
+        rate = 48000
+    elif packet[:5] == b"\x7fFLAC" and len(packet) >= 17 + 18:
+        metadata["codec"] = "flac"
+        packed = int.from_bytes(packet[17 + 10:17 + 18], "big")
+        metadata["sample_rate"] = rate = packed >> 44
+        metadata["channels"] = ((packed >> 41) & 0x07) + 1
+    else:
+        metadata["codec"] = "ogg"
+
+    last_page = tail.rfind(b"OggS")
+    if rate and last_page != -1 and last_page + 14 <= len(tail):
+        granule = struct.unpack_from("<q", tail, last_page + 6)[0]
+        if granule > 0:
+            metadata["duration"] = max(granule - pre_skip, 0) / rate
+            metadata["bitrate"] = int(size * 8 / metadata["duration"]) if metadata["duration"] else None
+    return metadata
+
+
+def find_mp4_box(data: bytes, box_type: bytes, start: int = 0) -> int:
+    """
+    Ищет бокс по типу в произвольном фрагменте файла.
+    Возвращает смещение начала данных бокса (после заголовка) или -1.
+    """
+    position = data.find(box_type, start + 4)
+    while position != -1:
+        box_size = struct.unpack_from(">I", data, position - 4)[0]
+        if box_size >= 8:
+            return position + 4
+        position = data.find(box_type, position + 1)
+    return -1
+
+
+def probe_m4a(head: bytes, tail: bytes, size: int) -> Optional[dict]:
+    if head[4:8] != b"ftyp":
+        return None
+    metadata = empty_metadata(size)
+    metadata["codec"] = "mp4"
+    # moov может находиться как в начале файла, так и в конце
+    for data in (head, tail):
+        mvhd = find_mp4_box(data, b"mvhd")
+        if mvhd != -1 and metadata["duration"] is None and mvhd + 32 <= len(data):
+            if data[mvhd] == 1:
+                timescale, duration = struct.unpack_from(">IQ", data, mvhd + 20)
+            else:
+                timescale, duration = struct.unpack_from(">II", data, mvhd + 12)
+            if timescale:
+                metadata["duration"] = duration / timescale
+        for codec, box_type in (("aac", b"mp4a"), ("alac", b"alac"), ("opus", b"Opus"), ("flac", b"fLaC")):
+            entry = find_mp4_box(data, box_type)
+            if entry != -1 and metadata["sample_rate"] is None and entry + 28 <= len(data):
+                metadata["codec"] = codec
+                metadata["channels"] = struct.unpack_from(">H", data, entry + 16)[0]
+                metadata["sample_rate"] = struct.unpack_from(">I", data, entry + 24)[0] >> 16
+                break
+    if metadata["duration"]:
+        metadata["bitrate"] = int(size * 8 / metadata["duration"])
+    return metadata
+
+
+def probe_audio(head: bytes, tail: bytes, size: int) -> dict:
+    """
+    Определяет параметры аудио по началу и концу файла.
+    Args:
+        head: Первые байты файла
+        tail: Последние байты файла
+        size: Полный размер файла в байтах
+    Returns:
+        dict: Значения колонок метаданных AudioFile; неизвестные равны None
+    """
+    for probe in (
+        lambda: probe_wav(head, size),
+        lambda: probe_flac(head, size),
+        lambda: probe_ogg(head, tail, size),
+        lambda: probe_m4a(head, tail, size),
+        lambda: probe_mp3(head, tail, size),
+    ):
+        try:
+            metadata = probe()
+        except (struct.error, IndexError, ZeroDivisionError):
+            metadata = None
+        if metadata:
+            return metadata
+    return empty_metadata(size)
+
+
+class ProbeBuffer:
+    """
+    Запоминает первые и последние байты проходящего через него потока.
+    """
+
+    def __init__(
+        self,
+        head_size: int = settings.PROBE_HEAD_BYTES,
+        tail_size: int = settings.PROBE_TAIL_BYTES
+    ):
+        self.head_size = head_size
+        self.tail_size = tail_size
+        self.head = bytearray()
+        self.size = 0
+        self._tail: deque[bytes] = deque()
+        self._tail_length = 0
+
+    def feed(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if len(self.head) < self.head_size:
+            self.head += chunk[:self.head_size - len(self.head)]
+        self._tail.append(chunk)
+        self._tail_length += len(chunk)
+        while self._tail_length - len(self._tail[0]) >= self.tail_size:
+            self._tail_length -= len(self._tail.popleft())
+
+    @property
+    def tail(self) -> bytes:
+        return b"".join(self._tail)[-self.tail_size:]
+
+    async def wrap(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            self.feed(chunk)
+            yield chunk
+
+
+class AudioProber:
+    """
+    Пул процессов для разбора заголовков аудио файлов.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=settings.PROBE_WORKERS)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    async def probe(self, head: bytes, tail: bytes, size: int) -> dict:
+        self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, probe_audio, bytes(head), bytes(tail), size)
+
+    async def probe_buffer(self, buffer: ProbeBuffer) -> dict:
+        return await self.probe(buffer.head, buffer.tail, buffer.size)
+
+    async def probe_object(self, storage, object_name: str, size: int) -> dict:
+        """
+        Определяет параметры уже загруженного объекта,
+        скачивая только его начало и конец.
+        """
+        if size == 0:
+            return empty_metadata(0)
+        head = await storage.download_range(
+            object_name, f"bytes=0-{min(size, settings.PROBE_HEAD_BYTES) - 1}"
+        )
+        tail = await storage.download_range(
+            object_name, f"bytes=-{min(size, settings.PROBE_TAIL_BYTES)}"
+        )
+        return await self.probe(head, tail, size)
+
+
+audio_prober = AudioProber()
@@ -0,0 +1,115 @@
+import asyncio
+from typing import List
+
+from app.core.config import settings
+from app.core.s3 import s3_client
+from app.core.waveform import PEAKS_SUFFIX, with_peaks
+from app.crud.crud_blob import blob as crud_blob
+from app.crud.crud_job import job as crud_job
+from app.crud.crud_pending_upload import pending_upload as crud_pending_upload
+from app.crud.crud_upload_session import upload_session as crud_upload_session
+from app.db.models import UploadSession
+from app.db.session import async_session
+
+
+async def expire_pending_uploads() -> int:
+    """
+    Удаляет просроченные presigned загрузки и объекты,
+    которые клиент успел загрузить, но так и не подтвердил.
+    Возвращает количество удаленных загрузок.
+    """
+    async with async_session() as db:
+        storage_paths = await crud_pending_upload.delete_expired(db)
+    await s3_client.delete_files(storage_paths)
+    return len(storage_paths)
+
+
+async def expire_upload_sessions() -> int:
+    """
+    Удаляет заброшенные сессии возобновляемой загрузки:
+    отменяет их multipart upload и удаляет сохраненный хвост.
+    Возвращает количество удаленных сессий.
+    """
+    async with async_session() as db:
+        expired = await crud_upload_session.delete_expired(db)
+    await abort_upload_sessions(expired)
+    return len(expired)
+
+
+async def collect_unreferenced_blobs() -> int:
+    """
+    Удаляет blob с нулевым refcount и их объекты в S3.
+    Возвращает количество удаленных объектов.
+    """
+    async with async_session() as db:
+        storage_paths = await crud_blob.delete_unreferenced(db)
+    await s3_client.delete_files(with_peaks(storage_paths))
+    return len(storage_paths)
+
+
+async def delete_failed_jobs() -> int:
+    """
+    Удаляет задачи, которые исчерпали попытки и хранятся
+    дольше JOB_FAILED_RETENTION_SECONDS.
+    Возвращает количество удаленных задач.
+    """
+    async with async_session() as db:
+        return await crud_job.delete_failed(
+            db, older_than=settings.JOB_FAILED_RETENTION_SECONDS
+        )
+
+
+async def abort_upload_sessions(upload_sessions: List[UploadSession]) -> None:
+    """
+    Отменяет multipart upload удаленных сессий и удаляет их хвосты.
+    """
+    for upload_session in upload_sessions:
+        await s3_client.abort_multipart_upload(
+            upload_session.storage_path, upload_session.s3_upload_id
+        )
+    await s3_client.delete_files(
+        upload_session.tail_path for upload_session in upload_sessions
+        if upload_session.tail_size
+    )
+
+
+async def delete_user_objects(user_id: int, upload_sessions: List[UploadSession]) -> int:
+    """
+    Удаляет из S3 объекты удаленного пользователя постранично, не держа
+    в памяти больше одной страницы list_objects_v2. Объекты blob не трогает:
+    на них могут ссылаться другие пользователи, а без ссылок их удалит
+    collect_unreferenced_blobs.
+    Возвращает количество удаленных объектов.
+    """
+    await abort_upload_sessions(upload_sessions)
+    deleted = 0
+    async with async_session() as db:
+        async for objects in s3_client.iter_objects(f"user_{user_id}/"):
+            object_names = [obj["Key"] for obj in objects]
+            # Файлы пиков живут и удаляются вместе со своим объектом
+            storage_paths = [name.removesuffix(PEAKS_SUFFIX) for name in object_names]
+            blob_paths = await crud_blob.get_storage_paths(db, storage_paths)
+            object_names = [
+                name for name, storage_path in zip(object_names, storage_paths)
+                if storage_path not in blob_paths
+            ]
+            failed = await s3_client.delete_files(object_names)
+            deleted += len(object_names) - len(failed)
+            # Не держим транзакцию открытой между страницами
+            await db.commit()
+    return deleted
+
+
+async def run_periodic_cleanup() -> None:
+    """
+    Периодически выполняет фоновую очистку. Запускается в lifespan приложения.
+    """
+    while True:
+        await asyncio.sleep(settings.CLEANUP_INTERVAL_SECONDS)
+        try:
+            await expire_pending_uploads()
+            await expire_upload_sessions()
+            await collect_unreferenced_blobs()
+            await delete_failed_jobs()
+        except Exception as e:
+            print(f"Error during cleanup: {e}")
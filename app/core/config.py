@@ -1,6 +1,6 @@
 from typing import Optional
 
-from pydantic import computed_field
+from pydantic import Field, computed_field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -11,6 +11,14 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     POSTGRES_PORT: str
+    POSTGRES_REPLICA_URL: Optional[str] = None
+    POSTGRES_POOL_SIZE: int = 10
+    POSTGRES_MAX_OVERFLOW: int = 20
+    POSTGRES_POOL_TIMEOUT: float = 30.0
+    POSTGRES_POOL_RECYCLE: int = 1800
+    POSTGRES_POOL_PRE_PING: bool = True
+    POSTGRES_PREPARE_THRESHOLD: Optional[int] = 5
+    READ_YOUR_WRITES_SECONDS: float = 5.0
 
     # Yandex OAuth
     YANDEX_CLIENT_ID: str
@@ -18,6 +26,10 @@ class Settings(BaseSettings):
     SERVER_DOMAIN: str
     TOKEN_URL: str = "https://oauth.yandex.ru/token"
     USER_INFO_URL: str = "https://login.yandex.ru/info"
+    YANDEX_HTTP2: bool = True
+    YANDEX_TIMEOUT: float = 10.0
+    YANDEX_MAX_CONNECTIONS: int = 20
+    YANDEX_KEEPALIVE_TIMEOUT: float = 60.0
 
     # JWT
     SECRET_KEY: str
@@ -30,6 +42,79 @@ class Settings(BaseSettings):
     MINIO_ROOT_USER: str
     MINIO_ROOT_PASSWORD: str
     MINIO_BUCKET_NAME: str
+    # S3 не принимает части меньше 5 МБ, кроме последней
+    S3_MULTIPART_PART_SIZE: int = Field(8 * 1024 * 1024, ge=5 * 1024 * 1024)
+    S3_MULTIPART_CONCURRENCY: int = 4
+    S3_MAX_POOL_CONNECTIONS: int = 50
+    S3_CONNECT_TIMEOUT: float = 5.0
+    S3_READ_TIMEOUT: float = 60.0
+    S3_KEEPALIVE_TIMEOUT: float = 60.0
+
+    # Downloads
+    STREAM_CHUNK_SIZE: int = 256 * 1024
+
+    # Presigned downloads
+    DOWNLOAD_URL_EXPIRE_SECONDS: int = 3600
+    DOWNLOAD_URL_CACHE_MARGIN_SECONDS: int = 300
+    DOWNLOAD_URL_CACHE_MAX_SIZE: int = 100000
+
+    # Presigned uploads
+    PRESIGNED_UPLOAD_EXPIRE_SECONDS: int = 3600
+    PENDING_UPLOAD_TTL_SECONDS: int = 24 * 60 * 60
+
+    # Batch uploads
+    BATCH_UPLOAD_MAX_FILES: int = 100
+    BATCH_UPLOAD_CONCURRENCY: int = 8
+
+    # Storage quotas
+    STORAGE_QUOTA_BYTES: Optional[int] = None
+    STORAGE_QUOTA_FILES: Optional[int] = None
+
+    # Upload rate limits
+    UPLOAD_REQUESTS_PER_SECOND: Optional[float] = 2.0
+    UPLOAD_REQUESTS_BURST: int = 20
+    UPLOAD_BANDWIDTH_BYTES_PER_SECOND: Optional[int] = 50 * 1024 * 1024
+    UPLOAD_BANDWIDTH_BURST_BYTES: int = 256 * 1024 * 1024
+    UPLOAD_RATE_LIMIT_MAX_USERS: int = 10000
+
+    # Resumable upload sessions
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 60 * 60
+    UPLOAD_SESSION_LOCK_SECONDS: int = 60
+
+    # Background cleanup
+    CLEANUP_INTERVAL_SECONDS: int = 300
+
+    # Background jobs
+    WORKER_CONCURRENCY: int = 4
+    WORKER_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_VISIBILITY_TIMEOUT_SECONDS: int = 300
+    JOB_RETRY_BACKOFF_SECONDS: float = 10.0
+    JOB_RETRY_BACKOFF_MAX_SECONDS: float = 3600.0
+    JOB_FAILED_RETENTION_SECONDS: int = 7 * 24 * 60 * 60
+
+    # Storage reconcile
+    RECONCILE_INTERVAL_SECONDS: Optional[int] = None
+    RECONCILE_GRACE_SECONDS: int = 24 * 60 * 60
+    RECONCILE_DRY_RUN: bool = False
+
+    # Admin export
+    EXPORT_CHUNK_SIZE: int = 10000
+
+    # Audio metadata probing
+    PROBE_HEAD_BYTES: int = 256 * 1024
+    PROBE_TAIL_BYTES: int = 2 * 1024 * 1024
+    PROBE_WORKERS: int = 2
+
+    # Waveform peaks
+    FFMPEG_PATH: str = "ffmpeg"
+    PEAKS_SAMPLES_PER_PEAK: int = 256
+    PEAKS_LEVELS: int = 8
+    PEAKS_SAMPLE_RATE: int = 44100
+
+    # User cache
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    USER_CACHE_MAX_SIZE: int = 10000
 
     # Admin
     ADMIN_EMAIL: Optional[str] = None
@@ -38,6 +123,7 @@ class Settings(BaseSettings):
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=True,
+        env_parse_none_str="null",
     )
 
     @computed_field
@@ -0,0 +1,38 @@
+import hashlib
+from typing import AsyncIterator, BinaryIO, Tuple
+
+
+class StreamHasher:
+    """
+    Считает SHA-256 проходящего через него потока.
+    """
+
+    def __init__(self):
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def feed(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    @property
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+    async def wrap(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            self.feed(chunk)
+            yield chunk
+
+
+def hash_file(file: BinaryIO, chunk_size: int = 1024 * 1024) -> Tuple[str, int]:
+    """
+    Считает SHA-256 и размер файла, после чего возвращает позицию в начало.
+    Блокирующая функция, вызывать через run_in_threadpool.
+    """
+    hasher = StreamHasher()
+    file.seek(0)
+    while chunk := file.read(chunk_size):
+        hasher.feed(chunk)
+    file.seek(0)
+    return hasher.hexdigest, hasher.size
@@ -0,0 +1,127 @@
+import asyncio
+import tempfile
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from app.core.audio_probe import audio_prober
+from app.core.config import settings
+from app.core.s3 import s3_client
+from app.core.waveform import compute_peaks, peaks_path
+from app.crud.crud_audio import audio as crud_audio
+from app.crud.crud_job import job as crud_job
+from app.db.models import Job
+from app.db.session import async_session
+
+PROBE_METADATA = "probe_metadata"
+COMPUTE_PEAKS = "compute_peaks"
+
+
+async def probe_metadata(payload: dict) -> None:
+    """
+    Определяет метаданные загруженного файла по началу и концу объекта.
+    """
+    async with async_session() as db:
+        audio_file = await crud_audio.get_audio_file(
+            db, id=payload["audio_file_id"], user_id=payload["user_id"]
+        )
+    if audio_file is None:
+        # Файл удалили раньше, чем до него дошла очередь
+        return
+    head = await s3_client.head_file(audio_file.storage_path)
+    if head is None:
+        raise RuntimeError(f"Object {audio_file.storage_path} not found")
+    audio_metadata = await audio_prober.probe_object(
+        s3_client, audio_file.storage_path, head["ContentLength"]
+    )
+    async with async_session() as db:
+        await crud_audio.update_metadata(db, id=audio_file.id, audio_metadata=audio_metadata)
+
+
+async def compute_waveform_peaks(payload: dict) -> None:
+    """
+    Строит пики для отрисовки волны и сохраняет их рядом с объектом.
+    Для дедуплицированного содержимого пики уже могут быть посчитаны.
+    """
+    async with async_session() as db:
+        audio_file = await crud_audio.get_audio_file(
+            db, id=payload["audio_file_id"], user_id=payload["user_id"]
+        )
+    if audio_file is None:
+        return
+    if await s3_client.head_file(peaks_path(audio_file.storage_path)) is not None:
+        return
+    with tempfile.NamedTemporaryFile(suffix=Path(audio_file.storage_path).suffix) as file:
+        body = (await s3_client.open_file(audio_file.storage_path))["Body"]
+        async with body:
+            # Запись на диск не должна блокировать цикл событий воркера
+            async for chunk in body.iter_chunks(settings.STREAM_CHUNK_SIZE):
+                await asyncio.to_thread(file.write, chunk)
+        await asyncio.to_thread(file.flush)
+        peaks = await asyncio.to_thread(
+            compute_peaks, file.name, audio_file.sample_rate or settings.PEAKS_SAMPLE_RATE
+        )
+    await s3_client.upload_bytes(peaks, peaks_path(audio_file.storage_path))
+
+
+JOB_HANDLERS: dict[str, Callable[[dict], Awaitable[None]]] = {
+    PROBE_METADATA: probe_metadata,
+    COMPUTE_PEAKS: compute_waveform_peaks,
+}
+
+
+def retry_delay(attempts: int) -> float:
+    """Экспоненциальная задержка перед повтором: 10, 20, 40... секунд"""
+    return min(
+        settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1),
+        settings.JOB_RETRY_BACKOFF_MAX_SECONDS
+    )
+
+
+async def run_job(job: Job) -> None:
+    """
+    Выполняет задачу и записывает результат: выполненная задача удаляется,
+    упавшая повторяется с задержкой, пока не кончатся попытки.
+    """
+    try:
+        if job.attempts > job.max_attempts:
+            raise RuntimeError("Visibility timeout exceeded on the last attempt")
+        handler = JOB_HANDLERS.get(job.kind)
+        if handler is None:
+            raise RuntimeError(f"Unknown job kind {job.kind}")
+        # Дольше visibility timeout задачу не держим: ее уже мог забрать другой воркер
+        await asyncio.wait_for(handler(job.payload), settings.JOB_VISIBILITY_TIMEOUT_SECONDS)
+    except Exception as e:
+        retry_in = retry_delay(job.attempts) if job.attempts < job.max_attempts else None
+        print(f"Error running job {job.kind} {job.id} (attempt {job.attempts}): {e!r}")
+        async with async_session() as db:
+            await crud_job.fail(db, job, error=repr(e), retry_in=retry_in)
+    else:
+        async with async_session() as db:
+            await crud_job.complete(db, job)
+
+
+async def work() -> None:
+    while True:
+        async with async_session() as db:
+            jobs = await crud_job.claim(
+                db, limit=1, visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT_SECONDS
+            )
+        if not jobs:
+            await asyncio.sleep(settings.WORKER_POLL_INTERVAL_SECONDS)
+            continue
+        await run_job(jobs[0])
+
+
+async def run_worker(concurrency: int = settings.WORKER_CONCURRENCY) -> None:
+    """
+    Выполняет задачи из очереди в concurrency параллельных потоков.
+    Воркеров можно запускать сколько угодно: задачи распределяются
+    между ними через базу.
+    """
+    await s3_client.start()
+    audio_prober.start()
+    try:
+        await asyncio.gather(*(work() for _ in range(concurrency)))
+    finally:
+        audio_prober.close()
+        await s3_client.close()
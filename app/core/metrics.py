@@ -0,0 +1,214 @@
+import bisect
+import math
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+THROUGHPUT_BUCKETS = tuple(float(2 ** power) for power in range(16, 32, 2))  # 64 КБ/с - 1 ГБ/с
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self._values.items()):
+            yield "", format_labels(self.labels, labels), value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # labels -> (счетчики по корзинам без накопления, сумма, количество)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        item = self._values.get(labels)
+        if item is None:
+            item = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        item[0][bisect.bisect_left(self.buckets, value)] += 1
+        item[1] += value
+        item[2] += 1
+
+    def samples(self):
+        for labels, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                yield "_bucket", format_labels(self.labels + ("le",), labels + (format_value(bound),)), cumulative
+            yield "_sum", format_labels(self.labels, labels), total
+            yield "_count", format_labels(self.labels, labels), count
+
+
+class Gauge(Metric):
+    """Значение считается при каждом сборе метрик"""
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], Dict[Tuple[str, ...], float]],
+        labels: Sequence[str] = ()
+    ):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in sorted(self.collect().items()):
+            yield "", format_labels(self.labels, labels), value
+
+
+class Registry:
+    """
+    Метрики процесса в текстовом формате Prometheus.
+    Рассчитан на использование из одного event loop, без блокировок.
+    """
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], Dict[Tuple[str, ...], float]],
+        labels: Sequence[str] = ()
+    ) -> Gauge:
+        return self.register(Gauge(name, help, collect, labels))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status")
+)
+s3_operation_duration = registry.histogram(
+    "s3_operation_duration_seconds",
+    "S3 API call latency, including retries",
+    ("operation",)
+)
+s3_operation_errors = registry.counter(
+    "s3_operation_errors_total",
+    "S3 API calls that failed or returned an error status",
+    ("operation", "code")
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time",
+    ("statement",)
+)
+db_query_errors = registry.counter(
+    "db_query_errors_total",
+    "SQL statements that raised an error",
+    ("statement",)
+)
+db_pool_checkout_duration = registry.histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a connection from the pool",
+    ("pool",)
+)
+upload_bytes = registry.counter(
+    "audio_upload_bytes_total",
+    "Bytes of audio received from clients",
+    ("method",)
+)
+upload_rejections = registry.counter(
+    "audio_upload_rejections_total",
+    "Uploads rejected by rate limits or storage quotas",
+    ("reason",)
+)
+upload_throughput = registry.histogram(
+    "audio_upload_throughput_bytes_per_second",
+    "Per-request upload throughput",
+    ("method",),
+    THROUGHPUT_BUCKETS
+)
+
+
+def record_upload(method: str, size: int, started: float) -> None:
+    """
+    Учитывает загрузку size байтов, начатую в момент started (time.perf_counter).
+    """
+    upload_bytes.inc(method, amount=size)
+    elapsed = time.perf_counter() - started
+    if size and elapsed > 0:
+        upload_throughput.observe(size / elapsed, method)
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from typing import AsyncIterator, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+class TokenBucket:
+    """
+    Маркерная корзина: пополняется со скоростью rate в секунду
+    до capacity. Баланс может уйти в минус, если списать больше, чем есть.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def take(self, amount: float = 1) -> float:
+        """
+        Списывает amount, если хватает баланса.
+        Returns:
+            float: 0, если списано, иначе через сколько секунд баланса хватит
+        """
+        self.refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> float:
+        """
+        Списывает amount безусловно.
+        Returns:
+            float: Через сколько секунд баланс снова станет неотрицательным
+        """
+        self.refill()
+        self.tokens -= amount
+        return self.debt()
+
+    def debt(self) -> float:
+        self.refill()
+        return max(0.0, -self.tokens / self.rate)
+
+    @property
+    def idle_ttl(self) -> float:
+        """Через сколько секунд простоя корзина гарантированно полна"""
+        return (self.capacity - min(self.tokens, 0)) / self.rate
+
+
+class UploadLimiter:
+    """
+    Ограничивает частоту запросов на загрузку и скорость приема байтов
+    для каждого пользователя. Корзины хранятся в памяти процесса; корзина,
+    простоявшая до полного пополнения, удаляется и создается заново
+    при следующем обращении. Рассчитан на использование из одного
+    event loop, без блокировок.
+    """
+
+    def __init__(
+        self,
+        *,
+        requests_per_second: Optional[float],
+        request_burst: int,
+        bytes_per_second: Optional[float],
+        burst_bytes: int,
+        max_users: int
+    ):
+        self.requests_per_second = requests_per_second
+        self.request_burst = request_burst
+        self.bytes_per_second = bytes_per_second
+        self.burst_bytes = burst_bytes
+        self._requests: TTLCache[TokenBucket] = TTLCache(maxsize=max_users, ttl=0)
+        self._bandwidth: TTLCache[TokenBucket] = TTLCache(maxsize=max_users, ttl=0)
+
+    def _bucket(
+        self, buckets: TTLCache[TokenBucket], user_id: int, rate: float, capacity: float
+    ) -> TokenBucket:
+        bucket = buckets.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(rate, capacity)
+        return bucket
+
+    def _save(self, buckets: TTLCache[TokenBucket], user_id: int, bucket: TokenBucket) -> None:
+        # Продлеваем жизнь корзины, пока она не пополнится
+        buckets.set(user_id, bucket, ttl=bucket.idle_ttl)
+
+    def admit(self, user_id: int) -> float:
+        """
+        Пропускает новый запрос на загрузку.
+        Returns:
+            float: 0, если запрос пропущен, иначе через сколько секунд повторить
+        """
+        if self.bytes_per_second is not None:
+            bandwidth = self._bucket(self._bandwidth, user_id, self.bytes_per_second, self.burst_bytes)
+            # Пока предыдущие загрузки не уложились в скорость, новые не принимаем
+            if bandwidth.debt():
+                return bandwidth.debt()
+        if self.requests_per_second is not None:
+            requests = self._bucket(self._requests, user_id, self.requests_per_second, self.request_burst)
+            retry_after = requests.take()
+            self._save(self._requests, user_id, requests)
+            return retry_after
+        return 0.0
+
+    def consume(self, user_id: int, size: int) -> float:
+        """
+        Учитывает уже принятые size байтов.
+        Returns:
+            float: Сколько секунд пользователь должен подождать до следующих байтов
+        """
+        if self.bytes_per_second is None or not size:
+            return 0.0
+        bandwidth = self._bucket(self._bandwidth, user_id, self.bytes_per_second, self.burst_bytes)
+        delay = bandwidth.consume(size)
+        self._save(self._bandwidth, user_id, bandwidth)
+        return delay
+
+    async def throttle(self, user_id: int, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """
+        Пропускает поток не быстрее bytes_per_second: перед чтением следующего
+        куска ждет, пока корзина не выйдет из минуса. Клиент при этом
+        упирается в TCP окно и сам снижает скорость.
+        """
+        async for chunk in chunks:
+            yield chunk
+            delay = self.consume(user_id, len(chunk))
+            if delay:
+                await asyncio.sleep(delay)
+
+
+upload_limiter = UploadLimiter(
+    requests_per_second=settings.UPLOAD_REQUESTS_PER_SECOND,
+    request_burst=settings.UPLOAD_REQUESTS_BURST,
+    bytes_per_second=settings.UPLOAD_BANDWIDTH_BYTES_PER_SECOND,
+    burst_bytes=settings.UPLOAD_BANDWIDTH_BURST_BYTES,
+    max_users=settings.UPLOAD_RATE_LIMIT_MAX_USERS
+)
@@ -0,0 +1,131 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Tuple
+
+from app.core.config import settings
+from app.core.s3 import BLOB_OBJECTS_PREFIX, DELETE_OBJECTS_BATCH_SIZE, s3_client
+from app.core.waveform import PEAKS_SUFFIX
+from app.crud.crud_audio import audio as crud_audio
+from app.db.session import async_session
+
+USER_OBJECTS_PREFIX = "user_"
+# Префиксы, которые сверяются по умолчанию
+OBJECT_PREFIXES = (USER_OBJECTS_PREFIX, BLOB_OBJECTS_PREFIX)
+
+
+@dataclass
+class ReconcileReport:
+    objects: int = 0
+    orphans: int = 0
+    deleted: int = 0
+    skipped_recent: int = 0
+    dangling: int = 0
+
+
+async def iter_object_entries(prefix: str) -> AsyncIterator[dict]:
+    async for objects in s3_client.iter_objects(prefix):
+        for obj in objects:
+            yield obj
+
+
+async def iter_storage_paths(prefix: str, page_size: int = 1000) -> AsyncIterator[Tuple[str, bool]]:
+    """
+    Перечисляет пути из базы постранично, каждую страницу в своей
+    короткой транзакции: долгая транзакция на весь обход бакета
+    задерживала бы vacuum на основной базе.
+    """
+    after = None
+    while True:
+        async with async_session() as db:
+            paths = await crud_audio.get_storage_paths(db, prefix=prefix, after=after, limit=page_size)
+        for path in paths:
+            yield path
+        if len(paths) < page_size:
+            return
+        after = paths[-1][0]
+
+
+async def reconcile_storage(
+    prefix: str = USER_OBJECTS_PREFIX,
+    *,
+    grace_seconds: int = settings.RECONCILE_GRACE_SECONDS,
+    dry_run: bool = False
+) -> ReconcileReport:
+    """
+    Сверяет объекты в MinIO с путями в базе. Оба списка приходят
+    отсортированными (list_objects_v2 и страницы путей из базы), поэтому они
+    сливаются за один проход, а в памяти держится не больше страницы
+    объектов, порции строк и пачки на удаление.
+    Объекты без ссылок старше grace_seconds удаляются (с dry_run только
+    считаются); более новые могут принадлежать загрузке, запись о которой
+    еще не создана. Строки, чей объект отсутствует, выводятся в лог.
+    Файл пиков идет в порядке ключей сразу за своим объектом и считается
+    нужным, если нужен объект.
+    """
+    report = ReconcileReport()
+    threshold = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+    batch = []
+
+    async def delete_orphan(obj: dict) -> None:
+        report.orphans += 1
+        if obj["LastModified"] > threshold:
+            report.skipped_recent += 1
+            return
+        print(f"Orphaned object: {obj['Key']}")
+        if dry_run:
+            return
+        batch.append(obj["Key"])
+        if len(batch) == DELETE_OBJECTS_BATCH_SIZE:
+            await flush()
+
+    async def flush() -> None:
+        failed = await s3_client.delete_files(batch)
+        report.deleted += len(batch) - len(failed)
+        batch.clear()
+
+    def dangling(storage_path: str, required: bool) -> None:
+        if required:
+            report.dangling += 1
+            print(f"Dangling storage path: {storage_path}")
+
+    objects = iter_object_entries(prefix)
+    paths = iter_storage_paths(prefix)
+    obj = await anext(objects, None)
+    path = await anext(paths, None)
+    last_path = None
+    while obj is not None or path is not None:
+        key = obj["Key"].encode() if obj is not None else None
+        storage_path = path[0].encode() if path is not None else None
+        if path is None or (obj is not None and key < storage_path):
+            report.objects += 1
+            if obj["Key"].removesuffix(PEAKS_SUFFIX) != last_path:
+                await delete_orphan(obj)
+            obj = await anext(objects, None)
+        elif obj is None or key > storage_path:
+            dangling(*path)
+            last_path = path[0]
+            path = await anext(paths, None)
+        else:
+            report.objects += 1
+            last_path = path[0]
+            obj = await anext(objects, None)
+            path = await anext(paths, None)
+    if batch:
+        await flush()
+    return report
+
+
+async def run_periodic_reconcile() -> None:
+    """
+    Периодически сверяет хранилище с базой. Запускается в lifespan
+    приложения, если задан RECONCILE_INTERVAL_SECONDS.
+    """
+    while True:
+        await asyncio.sleep(settings.RECONCILE_INTERVAL_SECONDS)
+        try:
+            for prefix in OBJECT_PREFIXES:
+                report = await reconcile_storage(prefix, dry_run=settings.RECONCILE_DRY_RUN)
+                print(f"Storage reconciled ({prefix}): {report}")
+        except Exception as e:
+            print(f"Error during reconcile: {e}")
@@ -1,20 +1,79 @@
+import asyncio
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Optional
+from uuid import uuid4
+
 import aioboto3
-from botocore.config import Config
+from aiobotocore.config import AioConfig
 from botocore.exceptions import ClientError
 from fastapi import UploadFile
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.metrics import s3_operation_duration, s3_operation_errors
+
+# Максимальное количество ключей в одном запросе DeleteObjects
+DELETE_OBJECTS_BATCH_SIZE = 1000
+
+# Объекты, которые могут стать общими blob. Путь не содержит id
+# пользователя: дедуплицированный файл получает путь чужого объекта,
+# и он не должен раскрывать, кто загрузил содержимое первым
+BLOB_OBJECTS_PREFIX = "blobs/"
+
+
+def blob_object_key(filename: str) -> str:
+    """Новый ключ объекта для содержимого, которое регистрируется как blob"""
+    return f"{BLOB_OBJECTS_PREFIX}{uuid4().hex}{Path(filename).suffix}"
+
+
+def start_operation_timer(model, context, **kwargs) -> None:
+    context["metrics_started_at"] = time.perf_counter()
+
+
+def record_operation(model, context, http_response, **kwargs) -> None:
+    s3_operation_duration.observe(
+        time.perf_counter() - context["metrics_started_at"], model.name
+    )
+    if http_response.status_code >= 400:
+        s3_operation_errors.inc(model.name, str(http_response.status_code))
+
+
+def record_operation_error(model, context, exception, **kwargs) -> None:
+    s3_operation_duration.observe(
+        time.perf_counter() - context["metrics_started_at"], model.name
+    )
+    s3_operation_errors.inc(model.name, type(exception).__name__)
 
 
 class S3Client:
     def __init__(self):
         self.session = aioboto3.Session()
-        self.config = Config(s3={'addressing_style': 'path'})
+        self.config = AioConfig(
+            # SigV4, чтобы в presigned PUT можно было подписать Content-Length
+            signature_version='s3v4',
+            s3={'addressing_style': 'path'},
+            max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+            connect_timeout=settings.S3_CONNECT_TIMEOUT,
+            read_timeout=settings.S3_READ_TIMEOUT,
+            connector_args={'keepalive_timeout': settings.S3_KEEPALIVE_TIMEOUT}
+        )
         self.bucket_name = settings.MINIO_BUCKET_NAME
+        self._exit_stack: Optional[AsyncExitStack] = None
+        self._client = None
+        # Подписанные ссылки на скачивание переиспользуются, пока до их
+        # истечения остается больше DOWNLOAD_URL_CACHE_MARGIN_SECONDS
+        self.url_cache: TTLCache[str] = TTLCache(
+            maxsize=settings.DOWNLOAD_URL_CACHE_MAX_SIZE,
+            ttl=settings.DOWNLOAD_URL_EXPIRE_SECONDS - settings.DOWNLOAD_URL_CACHE_MARGIN_SECONDS
+        )
 
     async def get_client(self):
         """
-        Создает и возвращает асинхронный клиент S3.
+        Создает и возвращает новый асинхронный клиент S3.
+        Для обработки запросов используется общий клиент self.client,
+        создаваемый один раз при старте приложения.
         Returns:
             aioboto3.client: Асинхронный клиент S3
         """
@@ -28,27 +87,61 @@ class S3Client:
             verify=False
         )
 
+    async def start(self) -> None:
+        """
+        Создает общий клиент S3 с пулом соединений.
+        Вызывается один раз в lifespan приложения.
+        """
+        if self._client is not None:
+            return
+        self._exit_stack = AsyncExitStack()
+        self._client = await self._exit_stack.enter_async_context(
+            await self.get_client()
+        )
+        # Время и ошибки каждого вызова S3 API, включая повторы
+        events = self._client.meta.events
+        events.register("before-call.s3", start_operation_timer)
+        events.register("after-call.s3", record_operation)
+        events.register("after-call-error.s3", record_operation_error)
+
+    async def close(self) -> None:
+        """
+        Закрывает общий клиент S3 и его пул соединений.
+        """
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+        self._exit_stack = None
+        self._client = None
+
+    @property
+    def client(self):
+        """
+        Общий клиент S3, созданный в start().
+        """
+        if self._client is None:
+            raise RuntimeError("S3 client is not started")
+        return self._client
+
     async def ensure_bucket_exists(self) -> bool:
         """
         Проверяет существование бакета и создает его, если он не существует.
         Возвращает True, если бакет существует или был создан.
         """
-        async with await self.get_client() as client:
-            try:
-                await client.head_bucket(Bucket=self.bucket_name)
-                return True
-            except ClientError as e:
-                error_code = e.response['Error']['Code']
-                if error_code == '404':
-                    try:
-                        await client.create_bucket(Bucket=self.bucket_name)
-                        return True
-                    except ClientError as create_error:
-                        print(f"Error creating bucket: {create_error}")
-                        return False
-                else:
-                    print(f"Error checking bucket: {e}")
+        try:
+            await self.client.head_bucket(Bucket=self.bucket_name)
+            return True
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code == '404':
+                try:
+                    await self.client.create_bucket(Bucket=self.bucket_name)
+                    return True
+                except ClientError as create_error:
+                    print(f"Error creating bucket: {create_error}")
                     return False
+            else:
+                print(f"Error checking bucket: {e}")
+                return False
 
     async def upload_file(self, file: UploadFile, object_name: str) -> bool:
         """
@@ -59,18 +152,165 @@ class S3Client:
         Returns:
             bool: True если загрузка успешна, False в противном случае
         """
-        async with await self.get_client() as client:
-            try:
-                await client.upload_fileobj(
-                    file.file,
-                    self.bucket_name,
-                    object_name,
-                    ExtraArgs={'ContentType': file.content_type}
-                )
-                return True
-            except ClientError as e:
-                print(f"Error uploading file: {e}")
-                return False
+        try:
+            await self.client.upload_fileobj(
+                file.file,
+                self.bucket_name,
+                object_name,
+                ExtraArgs={'ContentType': file.content_type}
+            )
+            return True
+        except ClientError as e:
+            print(f"Error uploading file: {e}")
+            return False
+
+    async def upload_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        object_name: str,
+        content_type: Optional[str] = None
+    ) -> int:
+        """
+        Загружает поток байтов в S3/MinIO через multipart upload, не сохраняя
+        файл целиком ни в памяти, ни на диске. Части загружаются параллельно,
+        одновременно в памяти находится не больше
+        S3_MULTIPART_CONCURRENCY + 1 частей. При любой ошибке (в том числе
+        при обрыве соединения клиентом) multipart upload отменяется.
+        Args:
+            chunks: Асинхронный итератор с содержимым файла
+            object_name: Имя объекта в бакете
+            content_type: MIME-тип объекта
+        Returns:
+            int: Количество загруженных байтов
+        """
+        part_size = settings.S3_MULTIPART_PART_SIZE
+        upload_id = await self.create_multipart_upload(object_name, content_type)
+        writer = self.multipart_writer(object_name, upload_id)
+        try:
+            buffer = bytearray()
+            size = 0
+            async for chunk in chunks:
+                buffer += chunk
+                size += len(chunk)
+                while len(buffer) >= part_size:
+                    body = bytes(buffer[:part_size])
+                    del buffer[:part_size]
+                    await writer.write_part(body)
+            if buffer or writer.next_part_number == 1:
+                await writer.write_part(bytes(buffer))
+            parts = await writer.flush()
+            await self.complete_multipart_upload(object_name, upload_id, parts)
+            return size
+        except BaseException:
+            await writer.cancel()
+            await asyncio.shield(self.abort_multipart_upload(object_name, upload_id))
+            raise
+
+    async def upload_bytes(self, body: bytes, object_name: str) -> None:
+        """
+        Загружает небольшой объект целиком.
+        """
+        await self.client.put_object(
+            Bucket=self.bucket_name,
+            Key=object_name,
+            Body=body
+        )
+
+    async def download_bytes(self, object_name: str) -> bytes:
+        """
+        Скачивает небольшой объект целиком.
+        """
+        response = await self.client.get_object(
+            Bucket=self.bucket_name,
+            Key=object_name
+        )
+        async with response['Body'] as body:
+            return await body.read()
+
+    async def download_range(self, object_name: str, byte_range: str) -> bytes:
+        """
+        Скачивает диапазон байтов объекта.
+        Args:
+            object_name: Имя объекта в бакете
+            byte_range: Значение заголовка Range, например "bytes=0-1023"
+        """
+        response = await self.client.get_object(
+            Bucket=self.bucket_name,
+            Key=object_name,
+            Range=byte_range
+        )
+        async with response['Body'] as body:
+            return await body.read()
+
+    async def open_file(self, object_name: str, byte_range: Optional[str] = None) -> dict:
+        """
+        Открывает объект для потокового чтения.
+        Args:
+            object_name: Имя объекта в бакете
+            byte_range: Значение заголовка Range или None для всего объекта
+        Returns:
+            dict: Ответ get_object; тело нужно дочитать или закрыть
+        """
+        params = {'Bucket': self.bucket_name, 'Key': object_name}
+        if byte_range:
+            params['Range'] = byte_range
+        return await self.client.get_object(**params)
+
+    async def create_multipart_upload(
+        self, object_name: str, content_type: Optional[str] = None
+    ) -> str:
+        """
+        Начинает multipart upload.
+        Returns:
+            str: UploadId
+        """
+        extra_args = {'ContentType': content_type} if content_type else {}
+        upload = await self.client.create_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=object_name,
+            **extra_args
+        )
+        return upload['UploadId']
+
+    def multipart_writer(
+        self, object_name: str, upload_id: str, next_part_number: int = 1
+    ) -> "MultipartWriter":
+        """
+        Создает загрузчик частей для начатого multipart upload.
+        """
+        return MultipartWriter(
+            self.client, self.bucket_name, object_name, upload_id, next_part_number
+        )
+
+    async def complete_multipart_upload(
+        self, object_name: str, upload_id: str, parts: list[dict]
+    ) -> None:
+        """
+        Собирает объект из загруженных частей.
+        """
+        await self.client.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=object_name,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+
+    async def abort_multipart_upload(self, object_name: str, upload_id: str) -> bool:
+        """
+        Отменяет multipart upload и удаляет загруженные части.
+        Returns:
+            bool: True если отмена успешна, False в противном случае
+        """
+        try:
+            await self.client.abort_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=object_name,
+                UploadId=upload_id
+            )
+            return True
+        except ClientError as e:
+            print(f"Error aborting multipart upload: {e}")
+            return False
 
     async def get_file_url(self, object_name: str) -> str:
         """
@@ -80,17 +320,78 @@ class S3Client:
         Returns:
             str: URL файла
         """
-        async with await self.get_client() as client:
-            try:
-                url = await client.generate_presigned_url(
+        try:
+            urls = await self.get_file_urls([object_name])
+            return urls[object_name]
+        except ClientError as e:
+            print(f"Error generating URL: {e}")
+            return ""
+
+    async def get_file_urls(self, object_names: Iterable[str]) -> dict[str, str]:
+        """
+        Генерирует URL для доступа к нескольким файлам общим клиентом.
+        Ранее подписанные ссылки берутся из кэша, пока они не близки к истечению.
+        Args:
+            object_names: Имена объектов в бакете
+        Returns:
+            dict[str, str]: Имя объекта -> URL файла
+        """
+        urls = {}
+        for object_name in object_names:
+            url = self.url_cache.get(object_name)
+            if url is None:
+                url = await self.client.generate_presigned_url(
                     'get_object',
                     Params={'Bucket': self.bucket_name, 'Key': object_name},
-                    ExpiresIn=3600
+                    ExpiresIn=settings.DOWNLOAD_URL_EXPIRE_SECONDS
                 )
-                return url
-            except ClientError as e:
-                print(f"Error generating URL: {e}")
-                return ""
+                self.url_cache.set(object_name, url)
+            urls[object_name] = url
+        return urls
+
+    async def get_upload_url(
+        self, object_name: str, content_type: str, size_bytes: int, expires_in: int
+    ) -> str:
+        """
+        Генерирует presigned URL для загрузки файла напрямую в MinIO (PUT).
+        Клиент обязан передать те же Content-Type и Content-Length,
+        что указаны при подписи, иначе MinIO отклонит запрос.
+        Args:
+            object_name: Имя объекта в бакете
+            content_type: MIME-тип объекта
+            size_bytes: Размер объекта в байтах
+            expires_in: Время жизни ссылки в секундах
+        Returns:
+            str: URL для загрузки
+        """
+        return await self.client.generate_presigned_url(
+            'put_object',
+            Params={
+                'Bucket': self.bucket_name,
+                'Key': object_name,
+                'ContentType': content_type,
+                'ContentLength': size_bytes
+            },
+            ExpiresIn=expires_in
+        )
+
+    async def head_file(self, object_name: str) -> Optional[dict]:
+        """
+        Возвращает метаданные объекта.
+        Args:
+            object_name: Имя объекта в бакете
+        Returns:
+            dict | None: Ответ head_object или None, если объекта нет
+        """
+        try:
+            return await self.client.head_object(
+                Bucket=self.bucket_name,
+                Key=object_name
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return None
+            raise
 
     async def delete_file(self, object_name: str) -> bool:
         """
@@ -100,16 +401,136 @@ class S3Client:
         Returns:
             bool: True если удаление успешно, False в противном случае
         """
-        async with await self.get_client() as client:
-            try:
-                await client.delete_object(
-                    Bucket=self.bucket_name,
-                    Key=object_name
-                )
-                return True
-            except ClientError as e:
-                print(f"Error deleting file: {e}")
-                return False
+        try:
+            await self.client.delete_object(
+                Bucket=self.bucket_name,
+                Key=object_name
+            )
+            return True
+        except ClientError as e:
+            print(f"Error deleting file: {e}")
+            return False
+
+    async def delete_files(self, object_names: Iterable[str]) -> list[str]:
+        """
+        Удаляет объекты пачками по 1000 ключей через DeleteObjects.
+        Args:
+            object_names: Имена объектов в бакете, можно передавать генератор
+        Returns:
+            list[str]: Имена объектов, которые удалить не удалось
+        """
+        failed = []
+        batch = []
+        for object_name in object_names:
+            batch.append(object_name)
+            if len(batch) == DELETE_OBJECTS_BATCH_SIZE:
+                failed.extend(await self._delete_batch(batch))
+                batch = []
+        if batch:
+            failed.extend(await self._delete_batch(batch))
+        return failed
+
+    async def _delete_batch(self, object_names: list[str]) -> list[str]:
+        try:
+            response = await self.client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={
+                    "Objects": [{"Key": object_name} for object_name in object_names],
+                    "Quiet": True
+                }
+            )
+        except ClientError as e:
+            print(f"Error deleting files: {e}")
+            return object_names
+        errors = response.get("Errors", [])
+        for error in errors:
+            print(f"Error deleting file {error['Key']}: {error.get('Message')}")
+        return [error["Key"] for error in errors]
+
+    async def iter_objects(self, prefix: str = "") -> AsyncIterator[list[dict]]:
+        """
+        Постранично перечисляет объекты бакета через list_objects_v2.
+        Args:
+            prefix: Префикс ключей
+        Returns:
+            AsyncIterator[list[dict]]: Страницы не больше 1000 объектов
+                с полями Key, Size и LastModified, ключи по возрастанию
+        """
+        paginator = self.client.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            objects = page.get("Contents", [])
+            if objects:
+                yield objects
+
+
+class MultipartWriter:
+    """
+    Загружает части multipart upload параллельно. Одновременно загружается
+    не больше S3_MULTIPART_CONCURRENCY частей, write_part ждет освобождения
+    слота, поэтому потребление памяти ограничено.
+    """
+
+    def __init__(
+        self,
+        client,
+        bucket_name: str,
+        object_name: str,
+        upload_id: str,
+        next_part_number: int = 1
+    ):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.upload_id = upload_id
+        self.next_part_number = next_part_number
+        self.parts: list[dict] = []
+        self._slots = asyncio.Semaphore(settings.S3_MULTIPART_CONCURRENCY)
+        self._tasks: set[asyncio.Task] = set()
+
+    async def _upload_part(self, part_number: int, body: bytes) -> None:
+        try:
+            response = await self.client.upload_part(
+                Bucket=self.bucket_name,
+                Key=self.object_name,
+                PartNumber=part_number,
+                UploadId=self.upload_id,
+                Body=body
+            )
+            self.parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+        finally:
+            self._slots.release()
+
+    async def write_part(self, body: bytes) -> None:
+        """
+        Ставит часть в очередь на загрузку. Пробрасывает ошибку
+        ранее завершившихся частей.
+        """
+        await self._slots.acquire()
+        for task in [task for task in self._tasks if task.done()]:
+            self._tasks.discard(task)
+            task.result()
+        self._tasks.add(asyncio.create_task(self._upload_part(self.next_part_number, body)))
+        self.next_part_number += 1
+
+    async def flush(self) -> list[dict]:
+        """
+        Дожидается загрузки всех частей.
+        Returns:
+            list[dict]: Загруженные части, отсортированные по номеру
+        """
+        await asyncio.gather(*self._tasks)
+        self._tasks.clear()
+        self.parts.sort(key=lambda part: part['PartNumber'])
+        return self.parts
+
+    async def cancel(self) -> None:
+        """
+        Прерывает загрузку частей.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
 
 
 s3_client = S3Client()
@@ -0,0 +1,190 @@
+import struct
+import subprocess
+import wave
+from typing import BinaryIO, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+PEAKS_SUFFIX = ".peaks"
+
+# Заголовок файла пиков: сигнатура, версия, число уровней, резерв,
+# частота дискретизации, сэмплов на пик нулевого уровня, пиков нулевого уровня.
+# Дальше идут уровни от подробного к грубому, каждый - пары int8 (min, max)
+PEAKS_MAGIC = b"PEAK"
+PEAKS_VERSION = 1
+PEAKS_HEADER = struct.Struct("<4sBBHIII")
+
+PEAKS_RESPONSE_HEADERS = ["X-Peaks-Levels", "X-Peaks-Sample-Rate", "X-Peaks-Samples-Per-Peak"]
+
+DECODE_CHUNK_FRAMES = 64 * 1024
+
+
+def peaks_path(storage_path: str) -> str:
+    """Путь файла пиков рядом с объектом аудио"""
+    return storage_path + PEAKS_SUFFIX
+
+
+def with_peaks(storage_paths: Iterable[str]) -> Iterator[str]:
+    """Пути объектов вместе с их файлами пиков, для удаления"""
+    for storage_path in storage_paths:
+        yield storage_path
+        yield peaks_path(storage_path)
+
+
+def level_counts(count: int, levels: int) -> List[int]:
+    """Количество пиков на каждом уровне: каждый следующий вдвое грубее"""
+    counts = [count]
+    for _ in range(levels - 1):
+        counts.append((counts[-1] + 1) // 2)
+    return counts
+
+
+def level_range(header: Tuple, level: int) -> Tuple[int, int]:
+    """
+    Returns:
+        tuple: Смещение уровня в файле пиков и его длина в байтах
+    """
+    _, _, levels, _, _, _, count = header
+    counts = level_counts(count, levels)
+    offset = PEAKS_HEADER.size + 2 * sum(counts[:level])
+    return offset, 2 * counts[level]
+
+
+class PeakBuilder:
+    """
+    Считает min/max для блоков по samples_per_peak кадров
+    по мере поступления сэмплов, не храня сам звук.
+    """
+
+    def __init__(self, channels: int, samples_per_peak: int):
+        self.width = channels * samples_per_peak
+        self.pending = np.empty(0, dtype=np.int16)
+        self.mins: List[np.ndarray] = []
+        self.maxs: List[np.ndarray] = []
+
+    def feed(self, samples: np.ndarray) -> None:
+        if self.pending.size:
+            samples = np.concatenate((self.pending, samples))
+        full = samples.size - samples.size % self.width
+        if full:
+            blocks = samples[:full].reshape(-1, self.width)
+            self.mins.append(blocks.min(axis=1))
+            self.maxs.append(blocks.max(axis=1))
+        self.pending = samples[full:]
+
+    def finish(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self.pending.size:
+            self.mins.append(self.pending.min(keepdims=True))
+            self.maxs.append(self.pending.max(keepdims=True))
+            self.pending = np.empty(0, dtype=np.int16)
+        if not self.mins:
+            return np.empty(0, dtype=np.int16), np.empty(0, dtype=np.int16)
+        return np.concatenate(self.mins), np.concatenate(self.maxs)
+
+
+def pcm_to_int16(frames: bytes, sample_width: int) -> np.ndarray:
+    """Приводит PCM сэмплы WAV любой разрядности к int16"""
+    if sample_width == 1:
+        return (np.frombuffer(frames, dtype=np.uint8).astype(np.int16) - 128) << 8
+    if sample_width == 2:
+        return np.frombuffer(frames, dtype="<i2")
+    if sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        # Старшие два байта 24-битного сэмпла и есть его 16-битное значение
+        return (raw[:, 1].astype(np.uint16) | (raw[:, 2].astype(np.uint16) << 8)).view(np.int16)
+    if sample_width == 4:
+        return (np.frombuffer(frames, dtype="<i4") >> 16).astype(np.int16)
+    raise wave.Error(f"unsupported sample width {sample_width}")
+
+
+def decode_wav(file: BinaryIO) -> Tuple[int, int, Iterator[np.ndarray]]:
+    """
+    Читает PCM WAV стандартной библиотекой.
+    Returns:
+        tuple: Частота дискретизации, число каналов и итератор кусков сэмплов
+    """
+    reader = wave.open(file, "rb")
+
+    def chunks() -> Iterator[np.ndarray]:
+        with reader:
+            while frames := reader.readframes(DECODE_CHUNK_FRAMES):
+                yield pcm_to_int16(frames, reader.getsampwidth())
+
+    return reader.getframerate(), reader.getnchannels(), chunks()
+
+
+def decode_ffmpeg(path: str, sample_rate: int) -> Tuple[int, int, Iterator[np.ndarray]]:
+    """
+    Декодирует остальные форматы локальным ffmpeg в моно s16le.
+    """
+    def chunks() -> Iterator[np.ndarray]:
+        process = subprocess.Popen(
+            [
+                settings.FFMPEG_PATH, "-v", "error", "-nostdin", "-i", path,
+                "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-"
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        try:
+            rest = b""
+            while data := process.stdout.read(DECODE_CHUNK_FRAMES * 2):
+                data = rest + data
+                # Из канала может прийти половина сэмпла, доберем ее со следующим куском
+                even = len(data) - len(data) % 2
+                rest = data[even:]
+                yield np.frombuffer(data[:even], dtype="<i2")
+        finally:
+            process.stdout.close()
+            stderr = process.stderr.read()
+            process.stderr.close()
+            if process.wait() != 0:
+                raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()}")
+
+    return sample_rate, 1, chunks()
+
+
+def compute_peaks(
+    path: str,
+    sample_rate: int,
+    samples_per_peak: int = settings.PEAKS_SAMPLES_PER_PEAK,
+    levels: int = settings.PEAKS_LEVELS
+) -> bytes:
+    """
+    Строит пирамиду пиков для файла на диске. WAV читается напрямую,
+    остальные форматы декодирует ffmpeg. Блокирующая функция,
+    вызывать в отдельном потоке.
+    Args:
+        path: Путь к файлу
+        sample_rate: Частота, в которой ffmpeg отдает звук
+        samples_per_peak: Сэмплов на один пик нулевого уровня
+        levels: Количество уровней
+    Returns:
+        bytes: Содержимое файла пиков
+    """
+    with open(path, "rb") as file:
+        try:
+            rate, channels, chunks = decode_wav(file)
+        except (wave.Error, EOFError):
+            rate, channels, chunks = decode_ffmpeg(path, sample_rate)
+        builder = PeakBuilder(channels, samples_per_peak)
+        for samples in chunks:
+            builder.feed(samples)
+    mins, maxs = builder.finish()
+
+    body = []
+    for level in range(levels):
+        if level:
+            if mins.size % 2:
+                mins = np.append(mins, mins[-1])
+                maxs = np.append(maxs, maxs[-1])
+            mins = mins.reshape(-1, 2).min(axis=1)
+            maxs = maxs.reshape(-1, 2).max(axis=1)
+        pairs = np.stack((mins >> 8, maxs >> 8), axis=1).astype(np.int8)
+        body.append(pairs.tobytes())
+    header = PEAKS_HEADER.pack(
+        PEAKS_MAGIC, PEAKS_VERSION, levels, 0, rate, samples_per_peak, len(body[0]) // 2
+    )
+    return header + b"".join(body)
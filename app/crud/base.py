@@ -25,6 +25,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     ) -> List[ModelType]:
         result = await db.execute(
             select(self.model)
+            .order_by(self.model.id)
             .offset(skip)
             .limit(limit)
         )
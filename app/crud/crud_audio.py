@@ -1,40 +1,238 @@
-from typing import List, Optional, Type
+from collections import Counter
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple, Type
 
-from sqlalchemy import select
+from sqlalchemy import (
+    REAL, and_, cast, delete, false, func, insert, literal_column, or_, select, true, tuple_,
+    union, union_all, update
+)
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import AudioFile
+from app.crud.crud_blob import blob as crud_blob
+from app.crud.crud_job import job as crud_job
+from app.crud.crud_usage import usage as crud_usage
+from app.db.models import AudioFile, Blob, PendingUpload, UploadSession
 from app.schemas.audio import AudioFileCreate
 
 
 class CRUDAudio:
+    # Колонки AudioFilePublic: списки читают только их, без ORM объектов
+    PUBLIC_COLUMNS = (
+        "filename", "storage_path", "size_bytes", "duration", "codec",
+        "sample_rate", "channels", "bitrate", "id", "user_id", "created_at",
+    )
+
     def __init__(self, model: Type[AudioFile]):
         self.model = model
 
+    def public_columns(self) -> list:
+        return [getattr(self.model, column) for column in self.PUBLIC_COLUMNS]
+
     async def create_audio_file(
-        self, db: AsyncSession, *, user_id: int, filename: str, storage_path: str
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        filename: str,
+        storage_path: str,
+        blob_sha256: Optional[str] = None,
+        audio_metadata: Optional[dict] = None,
+        jobs: Sequence[str] = ()
     ) -> AudioFile:
+        """
+        Создает запись о файле; задачи jobs ставятся в очередь, а счетчики
+        пользователя увеличиваются в той же транзакции.
+        """
         db_obj = self.model(
             user_id=user_id,
             filename=filename,
             original_filename=filename,
-            storage_path=storage_path
+            storage_path=storage_path,
+            blob_sha256=blob_sha256,
+            **(audio_metadata or {})
         )
         db.add(db_obj)
+        await crud_job.enqueue_for_audio_file(db, db_obj, jobs)
+        await crud_usage.add(db, user_id=user_id, size_bytes=db_obj.size_bytes or 0, files=1)
         await db.commit()
         await db.refresh(db_obj)
         return db_obj
 
-    async def get_user_audio_files(
-        self, db: AsyncSession, *, user_id: int, skip: int = 0, limit: int = 100
+    async def create_deduplicated_audio_file(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        filename: str,
+        storage_path: str,
+        sha256: str,
+        size_bytes: int,
+        audio_metadata: Optional[dict] = None,
+        jobs: Sequence[str] = ()
+    ) -> AudioFile:
+        """
+        Создает AudioFile, ссылающийся на blob с данным хэшем.
+        Если такое содержимое уже хранится, storage_path файла будет
+        указывать на существующий объект, а не на переданный.
+        """
+        db_blob = await crud_blob.acquire(
+            db, sha256=sha256, storage_path=storage_path, size_bytes=size_bytes
+        )
+        return await self.create_audio_file(
+            db,
+            user_id=user_id,
+            filename=filename,
+            storage_path=db_blob.storage_path,
+            blob_sha256=db_blob.sha256,
+            audio_metadata=audio_metadata,
+            jobs=jobs
+        )
+
+    async def create_deduplicated_audio_files(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        files: List[dict],
+        jobs: Sequence[str] = ()
     ) -> List[AudioFile]:
+        """
+        Создает несколько AudioFile в одной транзакции: один INSERT для
+        blob и один многострочный INSERT ... RETURNING для файлов.
+        Каждый элемент files содержит filename, storage_path, sha256,
+        size_bytes и audio_metadata. Файлы возвращаются в том же порядке;
+        storage_path указывает на объект blob, как в create_deduplicated_audio_file.
+        """
+        if not files:
+            return []
+        blobs = {}
+        for file in files:
+            if file["sha256"] in blobs:
+                blobs[file["sha256"]]["refcount"] += 1
+            else:
+                blobs[file["sha256"]] = {
+                    "sha256": file["sha256"],
+                    "storage_path": file["storage_path"],
+                    "size_bytes": file["size_bytes"],
+                    "refcount": 1,
+                }
+        db_blobs = await crud_blob.acquire_many(db, list(blobs.values()))
+
+        result = await db.scalars(
+            insert(self.model).returning(self.model, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": user_id,
+                    "filename": file["filename"],
+                    "original_filename": file["filename"],
+                    "storage_path": db_blobs[file["sha256"]].storage_path,
+                    "blob_sha256": file["sha256"],
+                    **file["audio_metadata"],
+                }
+                for file in files
+            ]
+        )
+        audio_files = list(result.all())
+        for audio_file in audio_files:
+            await crud_job.enqueue_for_audio_file(db, audio_file, jobs)
+        await crud_usage.add(
+            db,
+            user_id=user_id,
+            size_bytes=sum(audio_file.size_bytes or 0 for audio_file in audio_files),
+            files=len(audio_files)
+        )
+        await db.commit()
+        return audio_files
+
+    async def get_user_audio_files(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: int = 100
+    ) -> List[Row]:
+        """
+        Возвращает файлы пользователя от новых к старым строками
+        с колонками PUBLIC_COLUMNS.
+        after - (created_at, id) последнего файла предыдущей страницы.
+        """
+        stmt = select(*self.public_columns()).where(self.model.user_id == user_id)
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(self.model.created_at, self.model.id) < tuple_(*after)
+            )
         result = await db.execute(
-            select(self.model)
-            .where(self.model.user_id == user_id)
-            .offset(skip)
+            stmt
+            .order_by(self.model.created_at.desc(), self.model.id.desc())
             .limit(limit)
         )
-        return list(result.scalars().all())
+        return list(result.all())
+
+    def search_name(self):
+        """
+        Имя для поиска: filename и original_filename одной строкой. По этому
+        выражению построен GiST индекс, поэтому оно должно совпадать с ним.
+        """
+        return self.model.filename.op("||")(literal_column("' '")).op("||")(self.model.original_filename)
+
+    async def search_user_audio_files(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        query: str,
+        after: Optional[Tuple[float, int]] = None,
+        limit: int = 100
+    ) -> List[Row]:
+        """
+        Ищет файлы пользователя по filename и original_filename: нечеткое
+        совпадение (word_similarity выше pg_trgm.word_similarity_threshold)
+        или, для запросов от трех символов, подстрока без учета регистра.
+        Результаты идут от более похожих к менее похожим, при равной
+        похожести - по возрастанию id.
+        Каждое условие ищется отдельным запросом с LIMIT, который GiST индекс
+        (user_id, имя, id) обслуживает обходом в порядке похожести (KNN):
+        даже запрос вроде "mp3", совпадающий со всеми файлами, читает только
+        первые строки, а редкий запрос отсекается условием в индексе.
+        after - (похожесть, id) последнего файла предыдущей страницы.
+        Returns:
+            list: Строки с колонками PUBLIC_COLUMNS и похожестью rank
+        """
+        search_name = self.search_name()
+        rank = func.word_similarity(query, search_name)
+        conditions = [search_name.op("%>")(query)]
+        # Из запроса короче трех символов не получить триграмм для индекса
+        if len(query) >= 3:
+            conditions.append(search_name.icontains(query, autoescape=True))
+
+        def matches(condition):
+            stmt = select(self.model.id).where(self.model.user_id == user_id, condition)
+            if after is not None:
+                # word_similarity возвращает real, похожесть из курсора
+                # сравнивается в том же типе, иначе равные значения различаются
+                after_rank = cast(after[0], REAL)
+                stmt = stmt.where(or_(
+                    rank < after_rank,
+                    and_(rank == after_rank, self.model.id > after[1])
+                ))
+            # Оба ключа - операторы расстояния индекса: <->> это 1 - word_similarity,
+            # id <-> 0 это сам id
+            return (
+                stmt
+                .order_by(search_name.op("<->>")(query), self.model.id.op("<->")(0))
+                .limit(limit)
+            )
+
+        candidates = union(*(matches(condition) for condition in conditions)).subquery()
+        result = await db.execute(
+            select(*self.public_columns(), rank.label("rank"))
+            .where(self.model.id.in_(select(candidates.c.id)))
+            .order_by(rank.desc(), self.model.id)
+            .limit(limit)
+        )
+        return list(result.all())
 
     async def get_audio_file(
         self, db: AsyncSession, *, id: int, user_id: int
@@ -47,14 +245,131 @@ class CRUDAudio:
         )
         return result.scalar_one_or_none()
 
+    async def update_metadata(
+        self, db: AsyncSession, *, id: int, audio_metadata: dict
+    ) -> None:
+        """
+        Записывает метаданные файла и увеличивает версию списка файлов
+        пользователя в той же транзакции: метаданные входят в ответ списка.
+        """
+        result = await db.execute(
+            update(self.model)
+            .where(self.model.id == id)
+            .values(**audio_metadata)
+            .returning(self.model.user_id)
+        )
+        user_id = result.scalar_one_or_none()
+        if user_id is not None:
+            await crud_usage.touch(db, user_id)
+        await db.commit()
+
     async def delete_audio_file(
         self, db: AsyncSession, *, id: int, user_id: int
     ) -> Optional[AudioFile]:
+        """
+        Удаляет запись о файле. Для файлов с дедупликацией уменьшает
+        refcount blob; объекты без blob вызывающий код удаляет из S3 сам.
+        """
         audio_file = await self.get_audio_file(db, id=id, user_id=user_id)
         if audio_file:
             await db.delete(audio_file)
+            if audio_file.blob_sha256:
+                await crud_blob.release(db, audio_file.blob_sha256)
+            await crud_usage.add(
+                db, user_id=user_id, size_bytes=-(audio_file.size_bytes or 0), files=-1
+            )
             await db.commit()
         return audio_file
 
+    async def delete_audio_files(
+        self, db: AsyncSession, *, ids: List[int], user_id: int
+    ) -> List[AudioFile]:
+        """
+        Удаляет несколько файлов пользователя одним DELETE ... RETURNING
+        и освобождает их blob и место пользователя в той же транзакции.
+        Возвращает удаленные файлы; отсутствующие id пропускаются.
+        """
+        result = await db.scalars(
+            delete(self.model)
+            .where(self.model.id.in_(ids), self.model.user_id == user_id)
+            .returning(self.model)
+        )
+        audio_files = list(result.all())
+        await crud_blob.release_many(db, Counter(
+            audio_file.blob_sha256 for audio_file in audio_files if audio_file.blob_sha256
+        ))
+        await crud_usage.add(
+            db,
+            user_id=user_id,
+            size_bytes=-sum(audio_file.size_bytes or 0 for audio_file in audio_files),
+            files=-len(audio_files)
+        )
+        await db.commit()
+        return audio_files
+
+    EXPORT_COLUMNS = (
+        "id", "user_id", "filename", "original_filename", "storage_path", "blob_sha256",
+        "size_bytes", "duration", "codec", "sample_rate", "channels", "bitrate", "created_at",
+    )
+
+    async def stream_export_rows(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: Optional[int] = None,
+        chunk_size: int = 10000
+    ) -> AsyncIterator[Sequence[Row]]:
+        """
+        Потоково возвращает строки audio_files (колонки EXPORT_COLUMNS)
+        порциями по chunk_size через серверный курсор, без создания
+        ORM объектов, в порядке id. С user_id - только файлы пользователя.
+        """
+        stmt = select(*(getattr(self.model, column) for column in self.EXPORT_COLUMNS))
+        if user_id is not None:
+            stmt = stmt.where(self.model.user_id == user_id)
+        result = await db.stream(
+            stmt.order_by(self.model.id).execution_options(yield_per=chunk_size)
+        )
+        async for rows in result.partitions():
+            yield rows
+
+    async def get_storage_paths(
+        self,
+        db: AsyncSession,
+        *,
+        prefix: str,
+        after: Optional[str] = None,
+        limit: int = 1000
+    ) -> List[Tuple[str, bool]]:
+        """
+        Возвращает страницу путей объектов с данным префиксом, на которые
+        ссылается база, в порядке байтов, как их перечисляет list_objects_v2.
+        after - последний путь предыдущей страницы. Второй элемент - True,
+        если объект обязан существовать (файл или blob), и False для
+        незавершенных загрузок, объекта которых может еще не быть.
+        """
+        sources = union_all(*(
+            select(
+                model.storage_path.label("storage_path"),
+                required.label("required")
+            ).where(
+                model.storage_path.startswith(prefix, autoescape=True),
+                model.storage_path.collate("C") > after if after is not None else true()
+            )
+            for model, required in (
+                (self.model, true()),
+                (Blob, true()),
+                (PendingUpload, false()),
+                (UploadSession, false()),
+            )
+        )).subquery()
+        result = await db.execute(
+            select(sources.c.storage_path, func.bool_or(sources.c.required))
+            .group_by(sources.c.storage_path)
+            .order_by(sources.c.storage_path.collate("C"))
+            .limit(limit)
+        )
+        return [tuple(row) for row in result.all()]
+
 
 audio = CRUDAudio(AudioFile)
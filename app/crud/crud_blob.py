@@ -0,0 +1,140 @@
+from typing import Dict, Iterable, List, Optional, Set, Type
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import AudioFile, Blob
+
+
+class CRUDBlob:
+    def __init__(self, model: Type[Blob]):
+        self.model = model
+
+    async def get(self, db: AsyncSession, sha256: str) -> Optional[Blob]:
+        result = await db.execute(
+            select(self.model).where(
+                self.model.sha256 == sha256,
+                self.model.refcount > 0
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def get_many(self, db: AsyncSession, sha256s: Iterable[str]) -> Dict[str, Blob]:
+        result = await db.execute(
+            select(self.model).where(
+                self.model.sha256.in_(list(sha256s)),
+                self.model.refcount > 0
+            )
+        )
+        return {db_blob.sha256: db_blob for db_blob in result.scalars().all()}
+
+    async def acquire(
+        self, db: AsyncSession, *, sha256: str, storage_path: str, size_bytes: int
+    ) -> Blob:
+        """
+        Регистрирует ссылку на содержимое с данным хэшем. Если такое
+        содержимое уже хранится, увеличивает refcount и возвращает
+        существующий blob, иначе создает новый с путем storage_path.
+        Изменения не фиксируются, чтобы попасть в одну транзакцию
+        с созданием AudioFile.
+        """
+        stmt = (
+            insert(self.model)
+            .values(sha256=sha256, storage_path=storage_path, size_bytes=size_bytes, refcount=1)
+            .on_conflict_do_update(
+                index_elements=[self.model.sha256],
+                set_={"refcount": self.model.refcount + 1}
+            )
+            .returning(self.model)
+        )
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        return result.scalar_one()
+
+    async def acquire_many(self, db: AsyncSession, blobs: List[dict]) -> Dict[str, Blob]:
+        """
+        Пакетный вариант acquire одним INSERT ... ON CONFLICT.
+        Каждый элемент blobs содержит sha256, storage_path, size_bytes
+        и refcount - число новых ссылок; хэши не должны повторяться.
+        Строки блокируются в порядке sha256, чтобы два пакета с общими
+        хэшами не ждали друг друга по кругу.
+        """
+        if not blobs:
+            return {}
+        stmt = insert(self.model).values(sorted(blobs, key=lambda item: item["sha256"]))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self.model.sha256],
+            set_={"refcount": self.model.refcount + stmt.excluded.refcount}
+        ).returning(self.model)
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        return {db_blob.sha256: db_blob for db_blob in result.scalars().all()}
+
+    async def release(self, db: AsyncSession, sha256: str, count: int = 1) -> None:
+        """
+        Уменьшает refcount. Объекты без ссылок удаляет фоновая очистка.
+        """
+        await db.execute(
+            update(self.model)
+            .where(self.model.sha256 == sha256)
+            .values(refcount=self.model.refcount - count)
+        )
+
+    async def release_many(self, db: AsyncSession, counts: Dict[str, int]) -> None:
+        """
+        Уменьшает refcount нескольких blob одним executemany.
+        counts - количество освобождаемых ссылок для каждого хэша.
+        Строки обновляются в порядке sha256, как в acquire_many.
+        """
+        if not counts:
+            return
+        table = self.model.__table__
+        await db.execute(
+            update(table)
+            .where(table.c.sha256 == bindparam("b_sha256"))
+            .values(refcount=table.c.refcount - bindparam("b_count")),
+            [{"b_sha256": sha256, "b_count": count} for sha256, count in sorted(counts.items())]
+        )
+
+    async def get_storage_paths(self, db: AsyncSession, storage_paths: List[str]) -> Set[str]:
+        """
+        Возвращает те из переданных путей, которые принадлежат blob.
+        """
+        if not storage_paths:
+            return set()
+        result = await db.execute(
+            select(self.model.storage_path).where(self.model.storage_path.in_(storage_paths))
+        )
+        return set(result.scalars().all())
+
+    async def release_user_blobs(self, db: AsyncSession, user_id: int) -> None:
+        """
+        Уменьшает refcount всех blob, на которые ссылаются файлы пользователя.
+        Вызывается перед удалением пользователя.
+        """
+        counts = (
+            select(AudioFile.blob_sha256, func.count().label("files"))
+            .where(AudioFile.user_id == user_id, AudioFile.blob_sha256.is_not(None))
+            .group_by(AudioFile.blob_sha256)
+            .subquery()
+        )
+        await db.execute(
+            update(self.model)
+            .where(self.model.sha256 == counts.c.blob_sha256)
+            .values(refcount=self.model.refcount - counts.c.files)
+        )
+
+    async def delete_unreferenced(self, db: AsyncSession) -> List[str]:
+        """
+        Удаляет blob, на которые больше нет ссылок.
+        Возвращает пути объектов, которые нужно удалить из S3.
+        """
+        result = await db.execute(
+            delete(self.model)
+            .where(self.model.refcount <= 0)
+            .returning(self.model.storage_path)
+        )
+        await db.commit()
+        return list(result.scalars().all())
+
+
+blob = CRUDBlob(Blob)
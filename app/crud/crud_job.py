@@ -0,0 +1,128 @@
+from datetime import timedelta
+from typing import List, Optional, Sequence, Type
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import AudioFile, Job
+
+
+class CRUDJob:
+    def __init__(self, model: Type[Job]):
+        self.model = model
+
+    def enqueue(
+        self,
+        db: AsyncSession,
+        *,
+        kind: str,
+        payload: dict,
+        max_attempts: int = settings.JOB_MAX_ATTEMPTS
+    ) -> Job:
+        """
+        Добавляет задачу в сессию без commit, чтобы она попала
+        в одну транзакцию с данными, которые ее породили.
+        """
+        db_obj = self.model(
+            kind=kind,
+            payload=payload,
+            status="pending",
+            attempts=0,
+            max_attempts=max_attempts
+        )
+        db.add(db_obj)
+        return db_obj
+
+    async def enqueue_for_audio_file(
+        self, db: AsyncSession, audio_file: AudioFile, kinds: Sequence[str]
+    ) -> None:
+        """
+        Ставит задачи обработки нового файла в текущую транзакцию.
+        """
+        if not kinds:
+            return
+        if audio_file.id is None:
+            await db.flush()
+        for kind in kinds:
+            self.enqueue(
+                db,
+                kind=kind,
+                payload={"audio_file_id": audio_file.id, "user_id": audio_file.user_id}
+            )
+
+    async def claim(
+        self, db: AsyncSession, *, limit: int, visibility_timeout: int
+    ) -> List[Job]:
+        """
+        Забирает готовые к выполнению задачи. Строки выбираются
+        с FOR UPDATE SKIP LOCKED, поэтому воркеры не ждут друг друга и не
+        берут одну задачу дважды. Задача, воркер которой не отчитался
+        за visibility_timeout секунд, снова становится доступной.
+        """
+        candidates = (
+            select(self.model.id)
+            .where(or_(
+                and_(self.model.status == "pending", self.model.run_at <= func.now()),
+                and_(self.model.status == "running", self.model.locked_until <= func.now())
+            ))
+            .order_by(self.model.run_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.scalars(
+            update(self.model)
+            .where(self.model.id.in_(candidates.scalar_subquery()))
+            .values(
+                status="running",
+                attempts=self.model.attempts + 1,
+                locked_until=func.now() + timedelta(seconds=visibility_timeout)
+            )
+            .returning(self.model),
+            execution_options={"synchronize_session": False}
+        )
+        jobs = list(result.all())
+        await db.commit()
+        return jobs
+
+    async def complete(self, db: AsyncSession, job: Job) -> None:
+        await db.execute(delete(self.model).where(self.model.id == job.id))
+        await db.commit()
+
+    async def fail(
+        self, db: AsyncSession, job: Job, *, error: str, retry_in: Optional[float]
+    ) -> None:
+        """
+        Записывает ошибку. С retry_in задача повторится не раньше чем
+        через retry_in секунд, без него помечается как failed.
+        """
+        values = {"last_error": error, "locked_until": None}
+        if retry_in is None:
+            values["status"] = "failed"
+            # У failed задачи run_at хранит время ошибки, от него считается хранение
+            values["run_at"] = func.now()
+        else:
+            values["status"] = "pending"
+            values["run_at"] = func.now() + timedelta(seconds=retry_in)
+        await db.execute(
+            update(self.model).where(self.model.id == job.id).values(**values)
+        )
+        await db.commit()
+
+    async def delete_failed(self, db: AsyncSession, *, older_than: int) -> int:
+        """
+        Удаляет задачи, которые исчерпали попытки больше older_than секунд назад.
+        Возвращает количество удаленных задач.
+        """
+        result = await db.execute(
+            delete(self.model)
+            .where(
+                self.model.status == "failed",
+                self.model.run_at <= func.now() - timedelta(seconds=older_than)
+            )
+        )
+        await db.commit()
+        return result.rowcount
+
+
+job = CRUDJob(Job)
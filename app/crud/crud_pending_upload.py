@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence, Type
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_job import job as crud_job
+from app.crud.crud_usage import usage as crud_usage
+from app.db.models import AudioFile, PendingUpload
+
+
+class CRUDPendingUpload:
+    def __init__(self, model: Type[PendingUpload]):
+        self.model = model
+
+    async def create_pending_upload(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        filename: str,
+        storage_path: str,
+        content_type: str,
+        expires_in: int
+    ) -> PendingUpload:
+        db_obj = self.model(
+            user_id=user_id,
+            filename=filename,
+            storage_path=storage_path,
+            content_type=content_type,
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+        )
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def get_pending_upload(
+        self, db: AsyncSession, *, id: int, user_id: int, lock: bool = False
+    ) -> Optional[PendingUpload]:
+        """
+        Возвращает действующую ожидающую загрузку пользователя.
+        С lock=True строка блокируется до конца транзакции (FOR UPDATE):
+        параллельное подтверждение той же загрузки дождется первого
+        и уже не найдет строку.
+        """
+        stmt = select(self.model).where(
+            self.model.id == id,
+            self.model.user_id == user_id,
+            self.model.expires_at > func.now()
+        )
+        if lock:
+            stmt = stmt.with_for_update()
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def complete_pending_upload(
+        self,
+        db: AsyncSession,
+        *,
+        pending_upload: PendingUpload,
+        audio_metadata: Optional[dict] = None,
+        jobs: Sequence[str] = ()
+    ) -> AudioFile:
+        """
+        Создает AudioFile для загруженного объекта, ставит задачи jobs,
+        учитывает место пользователя и удаляет ожидающую загрузку в одной транзакции.
+        """
+        audio_file = AudioFile(
+            user_id=pending_upload.user_id,
+            filename=pending_upload.filename,
+            original_filename=pending_upload.filename,
+            storage_path=pending_upload.storage_path,
+            **(audio_metadata or {})
+        )
+        db.add(audio_file)
+        await crud_job.enqueue_for_audio_file(db, audio_file, jobs)
+        await crud_usage.add(
+            db, user_id=audio_file.user_id, size_bytes=audio_file.size_bytes or 0, files=1
+        )
+        await db.delete(pending_upload)
+        await db.commit()
+        await db.refresh(audio_file)
+        return audio_file
+
+    async def delete_expired(self, db: AsyncSession) -> List[str]:
+        """
+        Удаляет просроченные ожидающие загрузки.
+        Возвращает пути объектов, которые нужно удалить из S3.
+        """
+        result = await db.execute(
+            delete(self.model)
+            .where(self.model.expires_at <= func.now())
+            .returning(self.model.storage_path)
+        )
+        await db.commit()
+        return list(result.scalars().all())
+
+
+pending_upload = CRUDPendingUpload(PendingUpload)
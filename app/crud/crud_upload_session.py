@@ -0,0 +1,203 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence, Type
+from uuid import uuid4
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_job import job as crud_job
+from app.crud.crud_usage import usage as crud_usage
+from app.db.models import AudioFile, UploadSession
+
+
+class CRUDUploadSession:
+    def __init__(self, model: Type[UploadSession]):
+        self.model = model
+
+    async def create_upload_session(
+        self,
+        db: AsyncSession,
+        *,
+        id: str,
+        user_id: int,
+        filename: str,
+        content_type: str,
+        storage_path: str,
+        s3_upload_id: str,
+        length: Optional[int],
+        expires_in: int
+    ) -> UploadSession:
+        db_obj = self.model(
+            id=id,
+            user_id=user_id,
+            filename=filename,
+            content_type=content_type,
+            storage_path=storage_path,
+            s3_upload_id=s3_upload_id,
+            length=length,
+            offset=0,
+            parts_size=0,
+            parts=[],
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+        )
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def get_user_upload_sessions(
+        self, db: AsyncSession, user_id: int
+    ) -> List[UploadSession]:
+        result = await db.execute(
+            select(self.model).where(self.model.user_id == user_id)
+        )
+        return list(result.scalars().all())
+
+    async def get_upload_session(
+        self, db: AsyncSession, *, id: str, user_id: int, lock: bool = False
+    ) -> Optional[UploadSession]:
+        """
+        Возвращает активную сессию загрузки пользователя.
+        С lock=True строка блокируется до конца транзакции (FOR UPDATE NOWAIT),
+        чтобы два запроса не дописывали одну сессию одновременно.
+        """
+        stmt = select(self.model).where(
+            self.model.id == id,
+            self.model.user_id == user_id,
+            self.model.expires_at > func.now()
+        )
+        if lock:
+            stmt = stmt.with_for_update(nowait=True)
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def claim(
+        self, db: AsyncSession, *, id: str, user_id: int, lock_seconds: int
+    ) -> Optional[UploadSession]:
+        """
+        Занимает активную сессию пользователя на lock_seconds, если ее
+        никто не держит, и сразу фиксирует это. Тело запроса принимается
+        уже без открытой транзакции, а другой запрос к той же сессии
+        получит None, пока занятость не снимут или она не истечет.
+        """
+        token = uuid4().hex
+        result = await db.execute(
+            update(self.model)
+            .where(
+                self.model.id == id,
+                self.model.user_id == user_id,
+                self.model.expires_at > func.now(),
+                or_(self.model.locked_until.is_(None), self.model.locked_until <= func.now())
+            )
+            .values(lock_token=token, locked_until=func.now() + timedelta(seconds=lock_seconds))
+            .returning(self.model),
+            execution_options={"populate_existing": True}
+        )
+        upload_session = result.scalar_one_or_none()
+        await db.commit()
+        return upload_session
+
+    async def renew(
+        self, db: AsyncSession, *, upload_session: UploadSession, lock_seconds: int
+    ) -> bool:
+        """
+        Продлевает занятость сессии. False - сессию уже занял другой запрос.
+        """
+        result = await db.execute(
+            update(self.model)
+            .where(self.model.id == upload_session.id, self.model.lock_token == upload_session.lock_token)
+            .values(locked_until=func.now() + timedelta(seconds=lock_seconds))
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    async def release(self, db: AsyncSession, *, upload_session: UploadSession) -> None:
+        await db.execute(
+            update(self.model)
+            .where(self.model.id == upload_session.id, self.model.lock_token == upload_session.lock_token)
+            .values(lock_token=None, locked_until=None)
+        )
+        await db.commit()
+
+    async def record_chunk(
+        self,
+        db: AsyncSession,
+        *,
+        upload_session: UploadSession,
+        parts: List[dict],
+        parts_size: int,
+        offset: int,
+        expires_in: int
+    ) -> Optional[UploadSession]:
+        """
+        Записывает принятый кусок и снимает занятость одним условным UPDATE:
+        только если смещение не изменилось и сессию держит этот же запрос.
+        Иначе возвращает None.
+        """
+        result = await db.execute(
+            update(self.model)
+            .where(
+                self.model.id == upload_session.id,
+                self.model.offset == upload_session.offset,
+                self.model.lock_token == upload_session.lock_token
+            )
+            .values(
+                parts=list(upload_session.parts) + parts,
+                parts_size=parts_size,
+                offset=offset,
+                expires_at=datetime.now(timezone.utc) + timedelta(seconds=expires_in),
+                lock_token=None,
+                locked_until=None
+            )
+            .returning(self.model),
+            execution_options={"populate_existing": True}
+        )
+        upload_session = result.scalar_one_or_none()
+        await db.commit()
+        return upload_session
+
+    async def complete_upload_session(
+        self,
+        db: AsyncSession,
+        *,
+        upload_session: UploadSession,
+        audio_metadata: Optional[dict] = None,
+        jobs: Sequence[str] = ()
+    ) -> AudioFile:
+        """
+        Создает AudioFile для собранного объекта, ставит задачи jobs,
+        учитывает место пользователя и удаляет сессию в одной транзакции.
+        """
+        audio_file = AudioFile(
+            user_id=upload_session.user_id,
+            filename=upload_session.filename,
+            original_filename=upload_session.filename,
+            storage_path=upload_session.storage_path,
+            **(audio_metadata or {})
+        )
+        db.add(audio_file)
+        await crud_job.enqueue_for_audio_file(db, audio_file, jobs)
+        await crud_usage.add(
+            db, user_id=audio_file.user_id, size_bytes=audio_file.size_bytes or 0, files=1
+        )
+        await db.delete(upload_session)
+        await db.commit()
+        await db.refresh(audio_file)
+        return audio_file
+
+    async def delete_expired(self, db: AsyncSession) -> List[UploadSession]:
+        """
+        Удаляет заброшенные сессии загрузки.
+        Возвращает удаленные сессии, чтобы отменить их multipart upload.
+        """
+        result = await db.execute(
+            delete(self.model)
+            .where(self.model.expires_at <= func.now())
+            .returning(self.model)
+        )
+        expired = list(result.scalars().all())
+        await db.commit()
+        return expired
+
+
+upload_session = CRUDUploadSession(UploadSession)
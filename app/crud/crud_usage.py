@@ -0,0 +1,80 @@
+from typing import Optional, Type
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import UserUsage
+
+
+class CRUDUsage:
+    def __init__(self, model: Type[UserUsage]):
+        self.model = model
+
+    async def get(
+        self, db: AsyncSession, user_id: int, *, for_update: bool = False
+    ) -> Optional[UserUsage]:
+        stmt = select(self.model).where(self.model.user_id == user_id)
+        if for_update:
+            stmt = stmt.with_for_update()
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_version(self, db: AsyncSession, user_id: int) -> int:
+        """Версия списка файлов пользователя: одно чтение по первичному ключу"""
+        result = await db.execute(
+            select(self.model.version).where(self.model.user_id == user_id)
+        )
+        return result.scalar_one_or_none() or 0
+
+    async def ensure(self, db: AsyncSession, user_id: int) -> None:
+        """
+        Создает пустую строку для нового пользователя, не фиксируя изменения.
+        """
+        await db.execute(
+            insert(self.model)
+            .values(user_id=user_id, size_bytes=0, files=0)
+            .on_conflict_do_nothing(index_elements=[self.model.user_id])
+        )
+
+    async def add(
+        self, db: AsyncSession, *, user_id: int, size_bytes: int, files: int
+    ) -> None:
+        """
+        Прибавляет к счетчикам пользователя size_bytes и files
+        (отрицательные значения при удалении) одним INSERT ... ON CONFLICT.
+        При добавлении файлов обновляется и время последней загрузки,
+        а версия списка файлов увеличивается. Изменения не фиксируются, чтобы попасть в одну транзакцию
+        с созданием или удалением файлов.
+        """
+        if not size_bytes and not files:
+            return
+        values = {"user_id": user_id, "size_bytes": size_bytes, "files": files, "version": 1}
+        if files > 0:
+            values["last_upload_at"] = func.now()
+        stmt = insert(self.model).values(**values)
+        set_ = {
+            "size_bytes": self.model.size_bytes + stmt.excluded.size_bytes,
+            "files": self.model.files + stmt.excluded.files,
+            "version": self.model.version + 1,
+            "updated_at": func.now(),
+        }
+        if files > 0:
+            set_["last_upload_at"] = stmt.excluded.last_upload_at
+        await db.execute(
+            stmt.on_conflict_do_update(index_elements=[self.model.user_id], set_=set_)
+        )
+
+    async def touch(self, db: AsyncSession, user_id: int) -> None:
+        """
+        Увеличивает версию списка файлов, когда меняются данные файлов,
+        но не их количество. Изменения не фиксируются.
+        """
+        await db.execute(
+            update(self.model)
+            .where(self.model.user_id == user_id)
+            .values(version=self.model.version + 1)
+        )
+
+
+usage = CRUDUsage(UserUsage)
@@ -1,12 +1,20 @@
-from typing import Any, Dict, Optional, Union, List
-from sqlalchemy import select
+from typing import Any, Dict, Optional, Union, List, Tuple
+from sqlalchemy import and_, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
-from app.db.models import User
+from app.crud.crud_usage import usage as crud_usage
+from app.db.models import User, UserUsage
 from app.schemas.user import UserCreate, UserUpdate
 
 
+# Колонки UserPublic и UserStats: списки читают только их, без ORM объектов
+USER_PUBLIC_COLUMNS = (User.email, User.yandex_id, User.first_name, User.last_name, User.id, User.created_at)
+USER_STATS_COLUMNS = (UserUsage.files, UserUsage.size_bytes, UserUsage.last_upload_at)
+
+
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     @staticmethod
     async def get_by_yandex_id(db: AsyncSession, yandex_id: str):
@@ -15,14 +23,67 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         return result.scalar_one_or_none()
 
     async def get_multi(
-        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
-    ) -> List[User]:
+        self, db: AsyncSession, *, after: Optional[int] = None, limit: int = 100
+    ) -> List[Row]:
+        """Возвращает страницу пользователей по id строками с колонками USER_PUBLIC_COLUMNS"""
+        stmt = select(*USER_PUBLIC_COLUMNS)
+        if after is not None:
+            stmt = stmt.where(User.id > after)
         result = await db.execute(
-            select(User)
-            .offset(skip)
+            stmt
+            .order_by(User.id)
             .limit(limit)
         )
-        return list(result.scalars().all())
+        return list(result.all())
+
+    async def get_multi_with_stats(
+        self,
+        db: AsyncSession,
+        *,
+        sort_by: str = "id",
+        descending: bool = False,
+        after: Optional[Tuple[Any, int]] = None,
+        limit: int = 100
+    ) -> List[Row]:
+        """
+        Возвращает страницу пользователей вместе с их статистикой одним
+        запросом по users и user_usage, без агрегации по файлам.
+        Строки содержат колонки USER_PUBLIC_COLUMNS и USER_STATS_COLUMNS.
+        sort_by - id, files, size_bytes или last_upload_at; страница
+        идет по индексу (sort_by, user_id). Пользователи без загрузок
+        (last_upload_at IS NULL) считаются загружавшими раньше всех.
+        after - (значение sort_by, id) последнего пользователя предыдущей страницы.
+        """
+        key = UserUsage.user_id if sort_by == "id" else getattr(UserUsage, sort_by)
+        stmt = select(*USER_PUBLIC_COLUMNS, *USER_STATS_COLUMNS).join(UserUsage, UserUsage.user_id == User.id)
+        if after is not None:
+            value, id = after
+            if sort_by == "id":
+                stmt = stmt.where(key < id if descending else key > id)
+            elif value is None:
+                # NULL не сравнивается в tuple_, поэтому границу описываем явно
+                rest_of_nulls = and_(
+                    key.is_(None),
+                    UserUsage.user_id < id if descending else UserUsage.user_id > id
+                )
+                stmt = stmt.where(rest_of_nulls if descending else or_(rest_of_nulls, key.is_not(None)))
+            elif descending:
+                stmt = stmt.where(or_(
+                    tuple_(key, UserUsage.user_id) < tuple_(value, id), key.is_(None)
+                ))
+            else:
+                stmt = stmt.where(tuple_(key, UserUsage.user_id) > tuple_(value, id))
+        if sort_by == "id":
+            order_by = [key.desc() if descending else key]
+        elif sort_by != "last_upload_at":
+            order_by = [key.desc(), UserUsage.user_id.desc()] if descending else [key, UserUsage.user_id]
+        elif descending:
+            # Совпадает с обратным обходом индекса (last_upload_at NULLS FIRST, user_id)
+            order_by = [key.desc().nulls_last(), UserUsage.user_id.desc()]
+        else:
+            order_by = [key.asc().nulls_first(), UserUsage.user_id]
+        result = await db.execute(stmt.order_by(*order_by).limit(limit))
+        return list(result.all())
 
     async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
         db_obj = User(
@@ -32,10 +93,35 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             last_name=obj_in.last_name
         )
         db.add(db_obj)
+        await db.flush()
+        await crud_usage.ensure(db, db_obj.id)
         await db.commit()
         await db.refresh(db_obj)
         return db_obj
 
+    async def upsert_by_yandex_id(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
+        """
+        Возвращает пользователя с данным yandex_id, создавая его при первом
+        входе, одним INSERT ... ON CONFLICT. Данные существующего
+        пользователя не меняются. Одновременные входы не создают дубликатов.
+        """
+        stmt = insert(User).values(
+            yandex_id=obj_in.yandex_id,
+            email=obj_in.email,
+            first_name=obj_in.first_name,
+            last_name=obj_in.last_name
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.yandex_id],
+            # Пустое обновление нужно, чтобы RETURNING вернул существующую строку
+            set_={"yandex_id": stmt.excluded.yandex_id}
+        ).returning(User)
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        db_user = result.scalar_one()
+        await crud_usage.ensure(db, db_user.id)
+        await db.commit()
+        return db_user
+
     async def update(
         self,
         db: AsyncSession,
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Integer, String, DateTime, ForeignKey, func
+from sqlalchemy import BigInteger, Float, Index, Integer, JSON, String, DateTime, ForeignKey, func, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -21,23 +21,103 @@ class User(Base):
         server_default=func.now()
     )
 
+    # Файлы удаляет ON DELETE CASCADE в базе, не загружая их в память
     audio_files: Mapped[list["AudioFile"]] = relationship(
         back_populates="user",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
 
     def __repr__(self) -> str:
         return f"<User {self.email}>"
 
 
+class UserUsage(Base):
+    """
+    Сколько места и файлов занимает пользователь. Счетчики меняются
+    в тех же транзакциях, что создают и удаляют AudioFile, поэтому
+    для проверки квоты и списка пользователей со статистикой не нужно
+    считать SUM по файлам. Строка есть у каждого пользователя.
+    version увеличивается при каждом изменении списка файлов и служит
+    для ETag списков.
+    """
+    __tablename__ = "user_usage"
+    __table_args__ = (
+        # Для сортировки списка пользователей по статистике с keyset пагинацией
+        Index("ix_user_usage_size_bytes_user_id", "size_bytes", "user_id"),
+        Index("ix_user_usage_files_user_id", "files", "user_id"),
+        Index(
+            "ix_user_usage_last_upload_at_user_id",
+            text("last_upload_at NULLS FIRST"),
+            "user_id"
+        ),
+    )
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    size_bytes: Mapped[int] = mapped_column(BigInteger, default=0)
+    files: Mapped[int] = mapped_column(Integer, default=0)
+    last_upload_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"<UserUsage {self.user_id}>"
+
+
+class Blob(Base):
+    """
+    Объект в S3/MinIO, адресуемый по SHA-256 содержимого.
+    Одинаковые файлы хранятся один раз, refcount - количество AudioFile,
+    которые на него ссылаются.
+    """
+    __tablename__ = "blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    storage_path: Mapped[str] = mapped_column(String, unique=True)
+    size_bytes: Mapped[int] = mapped_column(BigInteger)
+    refcount: Mapped[int] = mapped_column(Integer, default=1, index=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"<Blob {self.sha256}>"
+
+
 class AudioFile(Base):
     __tablename__ = "audio_files"
+    __table_args__ = (
+        Index("ix_audio_files_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Поиск по имени в файлах пользователя в порядке похожести,
+        # нужны расширения pg_trgm и btree_gist
+        Index(
+            "ix_audio_files_user_id_search_name_trgm",
+            "user_id",
+            text("(filename || ' ' || original_filename) gist_trgm_ops"),
+            "id",
+            postgresql_using="gist",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     filename: Mapped[str] = mapped_column(String)  # Имя, данное пользователем
     original_filename: Mapped[str] = mapped_column(String)  # Оригинальное имя файла
     storage_path: Mapped[str] = mapped_column(String)  # Путь в S3/MinIO
+    blob_sha256: Mapped[str | None] = mapped_column(
+        String(64), ForeignKey("blobs.sha256"), nullable=True, index=True
+    )  # Содержимое файла, если оно хранится с дедупликацией
+    size_bytes: Mapped[int | None] = mapped_column(BigInteger, nullable=True, index=True)
+    duration: Mapped[float | None] = mapped_column(Float, nullable=True, index=True)  # Длительность в секундах
+    codec: Mapped[str | None] = mapped_column(String, nullable=True, index=True)
+    sample_rate: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    channels: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    bitrate: Mapped[int | None] = mapped_column(Integer, nullable=True)  # Бит в секунду
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now()
@@ -47,3 +127,87 @@ class AudioFile(Base):
 
     def __repr__(self) -> str:
         return f"<AudioFile {self.filename}>"
+
+
+class PendingUpload(Base):
+    __tablename__ = "pending_uploads"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    filename: Mapped[str] = mapped_column(String)
+    storage_path: Mapped[str] = mapped_column(String)  # Путь в S3/MinIO, куда клиент загружает файл
+    content_type: Mapped[str] = mapped_column(String)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"<PendingUpload {self.storage_path}>"
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    filename: Mapped[str] = mapped_column(String)
+    content_type: Mapped[str] = mapped_column(String)
+    storage_path: Mapped[str] = mapped_column(String)  # Путь итогового объекта в S3/MinIO
+    s3_upload_id: Mapped[str] = mapped_column(String)  # UploadId multipart upload
+    length: Mapped[int | None] = mapped_column(BigInteger, nullable=True)  # Заявленный размер файла
+    offset: Mapped[int] = mapped_column(BigInteger, default=0)  # Сколько байтов уже принято
+    parts_size: Mapped[int] = mapped_column(BigInteger, default=0)  # Сколько байтов загружено частями
+    parts: Mapped[list] = mapped_column(JSON, default=list)  # Загруженные части: PartNumber и ETag
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+    # Запрос, который сейчас дописывает сессию, и до какого времени он ее держит
+    lock_token: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+    @property
+    def tail_path(self) -> str:
+        """Путь объекта с хвостом, не набравшим полную часть"""
+        return f"sessions/{self.id}.tail"
+
+    @property
+    def tail_size(self) -> int:
+        return self.offset - self.parts_size
+
+    def __repr__(self) -> str:
+        return f"<UploadSession {self.id}>"
+
+
+class Job(Base):
+    """Фоновая задача, которую выполняет python -m app.worker"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String)
+    payload: Mapped[dict] = mapped_column(JSON, default=dict)
+    status: Mapped[str] = mapped_column(String, default="pending")  # pending, running или failed
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer)
+    run_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )  # Не раньше какого времени можно взять задачу; у failed - время ошибки
+    locked_until: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )  # До какого времени задача занята воркером
+    last_error: Mapped[str | None] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"<Job {self.kind} {self.id}>"
@@ -1,12 +1,66 @@
+import time
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import settings
+from app.core.metrics import db_pool_checkout_duration, db_query_duration, db_query_errors
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, замеряющий ожидание свободного соединения"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_duration.observe(time.perf_counter() - started, self.logging_name)
+
+
+def statement_kind(statement: str) -> str:
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info["query_started_at"].pop()
+    db_query_duration.observe(time.perf_counter() - started, statement_kind(statement))
+
+
+def handle_error(exception_context) -> None:
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started_at"):
+        connection.info["query_started_at"].pop()
+    if exception_context.statement:
+        db_query_errors.inc(statement_kind(exception_context.statement))
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    future=True
-)
+
+def create_engine(url: str, name: str):
+    db_engine = create_async_engine(
+        url,
+        future=True,
+        poolclass=TimedQueuePool,
+        pool_logging_name=name,
+        pool_size=settings.POSTGRES_POOL_SIZE,
+        max_overflow=settings.POSTGRES_MAX_OVERFLOW,
+        pool_timeout=settings.POSTGRES_POOL_TIMEOUT,
+        pool_recycle=settings.POSTGRES_POOL_RECYCLE,
+        pool_pre_ping=settings.POSTGRES_POOL_PRE_PING,
+        connect_args={"prepare_threshold": settings.POSTGRES_PREPARE_THRESHOLD}
+    )
+    event.listen(db_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(db_engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(db_engine.sync_engine, "handle_error", handle_error)
+    return db_engine
+
+
+engine = create_engine(settings.DATABASE_URL, "primary")
 
 async_session = sessionmaker(
     engine,
@@ -15,3 +69,20 @@ async_session = sessionmaker(
     autocommit=False,
     autoflush=False
 )
+
+# Реплика только для чтения; без нее чтение идет в основную базу
+read_engine = create_engine(settings.POSTGRES_REPLICA_URL, "replica") if settings.POSTGRES_REPLICA_URL else engine
+
+async_read_session = sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False
+)
+
+
+@event.listens_for(Session, "after_commit")
+def mark_committed(session: Session) -> None:
+    """Отмечает сессию, в которой что-то записали, для read-your-writes"""
+    session.info["committed"] = True
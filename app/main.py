@@ -1,18 +1,45 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.routers import auth, audio, admin
+from app.api.middleware import MetricsMiddleware
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.api.routers import auth, audio, admin, metrics
+from app.auth.yandex import yandex_oauth
+from app.core.audio_probe import audio_prober
+from app.core.cleanup import run_periodic_cleanup
+from app.core.config import settings
+from app.core.reconcile import run_periodic_reconcile
 from app.core.s3 import s3_client
+from app.core.waveform import PEAKS_RESPONSE_HEADERS
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    bucket_exists = await s3_client.ensure_bucket_exists()
-    if not bucket_exists:
-        print("Warning: Failed to ensure bucket exists!")
-    yield
+    await s3_client.start()
+    await yandex_oauth.start()
+    audio_prober.start()
+    try:
+        bucket_exists = await s3_client.ensure_bucket_exists()
+        if not bucket_exists:
+            print("Warning: Failed to ensure bucket exists!")
+        background_tasks = [asyncio.create_task(run_periodic_cleanup())]
+        if settings.RECONCILE_INTERVAL_SECONDS:
+            background_tasks.append(asyncio.create_task(run_periodic_reconcile()))
+        try:
+            yield
+        finally:
+            for task in background_tasks:
+                task.cancel()
+            for task in background_tasks:
+                with suppress(asyncio.CancelledError):
+                    await task
+    finally:
+        audio_prober.close()
+        await yandex_oauth.close()
+        await s3_client.close()
 
 
 app = FastAPI(title="Audio Upload Service", lifespan=lifespan)
@@ -23,8 +50,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, *PEAKS_RESPONSE_HEADERS],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(audio.router, prefix="/audio", tags=["audio"])
 app.include_router(admin.router, prefix="/admin", tags=["admin"])
+app.include_router(metrics.router, tags=["metrics"])
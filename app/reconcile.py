@@ -0,0 +1,37 @@
+"""
+Сверяет объекты в MinIO с записями в базе: удаляет объекты без записей
+и выводит записи, чьих объектов нет.
+
+    python -m app.reconcile --dry-run
+"""
+import argparse
+import asyncio
+
+from app.core.config import settings
+from app.core.reconcile import OBJECT_PREFIXES, reconcile_storage
+from app.core.s3 import s3_client
+
+
+async def main(prefixes: list[str], grace_seconds: int, dry_run: bool) -> None:
+    await s3_client.start()
+    try:
+        for prefix in prefixes:
+            report = await reconcile_storage(
+                prefix, grace_seconds=grace_seconds, dry_run=dry_run
+            )
+            print(
+                f"prefix={prefix} objects={report.objects} orphans={report.orphans} "
+                f"deleted={report.deleted} skipped_recent={report.skipped_recent} "
+                f"dangling={report.dangling}"
+            )
+    finally:
+        await s3_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prefix", action="append", dest="prefixes")
+    parser.add_argument("--grace-seconds", type=int, default=settings.RECONCILE_GRACE_SECONDS)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.prefixes or list(OBJECT_PREFIXES), args.grace_seconds, args.dry_run))
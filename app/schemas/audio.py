@@ -1,5 +1,7 @@
 from datetime import datetime
-from pydantic import BaseModel
+from typing import Optional
+
+from pydantic import BaseModel, Field
 
 
 class AudioFileBase(BaseModel):
@@ -11,10 +13,62 @@ class AudioFileCreate(AudioFileBase):
     user_id: int
 
 
-class AudioFilePublic(AudioFileBase):
+class AudioFileMetadata(BaseModel):
+    size_bytes: Optional[int] = None
+    duration: Optional[float] = None
+    codec: Optional[str] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    bitrate: Optional[int] = None
+
+
+class AudioFilePublic(AudioFileMetadata, AudioFileBase):
     id: int
     user_id: int
     created_at: datetime
+    download_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class AudioFileBatchResult(BaseModel):
+    filename: str
+    audio_file: Optional[AudioFilePublic] = None
+    error: Optional[str] = None
+
+
+class AudioFileBulkDelete(BaseModel):
+    deleted: list[int]
+    not_found: list[int]
+
+
+class UploadUrlRequest(BaseModel):
+    filename: str
+    content_type: str
+    size_bytes: int = Field(gt=0)  # Подписывается в URL как Content-Length
+
+
+class UploadUrlPublic(BaseModel):
+    upload_id: int
+    url: str
+    method: str = "PUT"
+    headers: dict[str, str]
+    expires_at: datetime
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    content_type: str
+    length: Optional[int] = None
+
+
+class UploadSessionPublic(BaseModel):
+    id: str
+    filename: str
+    offset: int
+    length: Optional[int] = None
+    expires_at: datetime
 
     class Config:
         from_attributes = True
@@ -22,9 +22,19 @@ class UserUpdate(UserBase):
     pass
 
 
+class UserStats(BaseModel):
+    files: int
+    size_bytes: int
+    last_upload_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 class UserPublic(UserBase):
     id: int
     created_at: datetime
+    stats: Optional[UserStats] = None  # Только в GET /admin/users?with_stats=true
 
     class Config:
         from_attributes = True
@@ -0,0 +1,20 @@
+"""
+Выполняет фоновые задачи из таблицы jobs.
+
+    python -m app.worker --concurrency 4
+"""
+import argparse
+import asyncio
+
+from app.core.config import settings
+from app.core.jobs import run_worker
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_worker(args.concurrency))
+    except KeyboardInterrupt:
+        pass
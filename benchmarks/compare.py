@@ -0,0 +1,59 @@
+"""
+Сравнивает два файла результатов benchmarks.load: для каждого сценария
+с одинаковыми параметрами выводит изменение пропускной способности,
+перцентилей и пиковой памяти сервера.
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import json
+from typing import Optional
+
+METRICS = [
+    ("rps", lambda scenario: scenario["requests_per_s"]),
+    ("rows/s", lambda scenario: scenario.get("rows_per_s")),
+    ("MB/s", lambda scenario: scenario["bytes_per_s"] / 2 ** 20),
+    ("p50", lambda scenario: scenario["latency_ms"]["p50"]),
+    ("p95", lambda scenario: scenario["latency_ms"]["p95"]),
+    ("p99", lambda scenario: scenario["latency_ms"]["p99"]),
+    ("rss", lambda scenario: scenario["server_peak_rss_mb"]),
+]
+
+
+def load(path: str) -> dict:
+    with open(path) as file:
+        results = json.load(file)
+    return {
+        (scenario["name"], json.dumps(scenario["params"], sort_keys=True)): scenario
+        for scenario in results["scenarios"]
+    }
+
+
+def change(old: Optional[float], new: Optional[float]) -> str:
+    if old is None or new is None:
+        return "n/a"
+    if not old:
+        return f"{new:.1f}"
+    return f"{new:.1f} ({(new - old) / old * 100:+.0f}%)"
+
+
+def main(baseline: str, candidate: str) -> None:
+    old_results = load(baseline)
+    new_results = load(candidate)
+    for key, new in new_results.items():
+        old = old_results.get(key)
+        name, params = key
+        if old is None:
+            print(f"{name} {params}: no baseline")
+            continue
+        print(f"{name} {params}")
+        for metric, value in METRICS:
+            print(f"    {metric:<6} {change(value(old), value(new))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+    main(args.baseline, args.candidate)
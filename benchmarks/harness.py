@@ -0,0 +1,220 @@
+"""
+Общие части нагрузочных сценариев: запуск приложения, замер времени
+запросов, пиковая память сервера и запись результатов в JSON.
+"""
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentile(timings: list[float], q: float) -> float:
+    """Перцентиль по ближайшему рангу для отсортированного списка"""
+    if not timings:
+        return 0.0
+    return timings[min(len(timings) - 1, max(0, int(len(timings) * q + 0.5) - 1))]
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    params: dict
+    requests: int
+    errors: int
+    duration_s: float
+    requests_per_s: float
+    bytes_per_s: float
+    latency_ms: dict
+    server_peak_rss_mb: Optional[float]
+    client_peak_rss_mb: float
+    rows_per_s: Optional[float] = None
+    error_samples: list[str] = field(default_factory=list)
+
+    def report(self) -> None:
+        params = " ".join(f"{key}={value}" for key, value in self.params.items())
+        latency = self.latency_ms
+        rss = f"{self.server_peak_rss_mb:.0f}MB" if self.server_peak_rss_mb is not None else "n/a"
+        rows = f" rows/s={self.rows_per_s:.0f}" if self.rows_per_s is not None else ""
+        print(
+            f"{self.name:<8} {params:<32} "
+            f"req={self.requests:<6} err={self.errors:<4} "
+            f"rps={self.requests_per_s:9.1f} "
+            f"MB/s={self.bytes_per_s / 2 ** 20:8.1f} "
+            f"p50={latency['p50']:9.2f}ms p95={latency['p95']:9.2f}ms p99={latency['p99']:9.2f}ms "
+            f"rss={rss}{rows}"
+        )
+
+
+class Server:
+    """
+    Приложение под нагрузкой. Без url запускает uvicorn отдельным
+    процессом с текущим окружением, чтобы память и CPU сервера
+    не смешивались с генератором нагрузки.
+    """
+
+    def __init__(self, url: Optional[str] = None, pid: Optional[int] = None):
+        self.url = url
+        self.pid = pid
+        self._process: Optional[subprocess.Popen] = None
+
+    async def start(self) -> None:
+        if self.url is None:
+            with socket.socket() as sock:
+                sock.bind(("127.0.0.1", 0))
+                port = sock.getsockname()[1]
+            self._process = subprocess.Popen([
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+            ])
+            self.url = f"http://127.0.0.1:{port}"
+            self.pid = self._process.pid
+        async with httpx.AsyncClient() as client:
+            for _ in range(300):
+                if self._process is not None and self._process.poll() is not None:
+                    raise RuntimeError("Application exited during startup")
+                try:
+                    await client.get(f"{self.url}/metrics")
+                    return
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+        raise RuntimeError(f"Application at {self.url} did not start")
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait(timeout=30)
+
+    def reset_peak_rss(self) -> None:
+        """Сбрасывает пиковую память процесса, чтобы мерить каждый сценарий отдельно"""
+        if self.pid is None:
+            return
+        try:
+            Path(f"/proc/{self.pid}/clear_refs").write_text("5")
+        except OSError:
+            pass
+
+    def peak_rss_mb(self) -> Optional[float]:
+        if self.pid is None:
+            return None
+        try:
+            status = Path(f"/proc/{self.pid}/status").read_text()
+        except OSError:
+            return None
+        for line in status.splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+        return None
+
+
+async def run_scenario(
+    server: Server,
+    name: str,
+    params: dict,
+    call: Callable[[int], Awaitable[httpx.Response]],
+    *,
+    requests: int,
+    concurrency: int,
+    request_bytes: Callable[[int], int] = lambda index: 0,
+    rows_per_request: Optional[int] = None
+) -> ScenarioResult:
+    """
+    Выполняет requests вызовов call(index) в concurrency параллельных
+    потоков и собирает статистику. Ответ со статусом 400 и выше
+    считается ошибкой и не входит в перцентили. Для списков
+    rows_per_request - сколько строк в каждом ответе, по нему
+    считаются строки в секунду.
+    """
+    timings = []
+    errors = []
+    transferred = 0
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal next_index, transferred
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                response = await call(index)
+            except httpx.HTTPError as e:
+                errors.append(repr(e))
+                continue
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                errors.append(f"{response.status_code} {response.text[:200]}")
+                continue
+            timings.append(elapsed)
+            transferred += request_bytes(index) + len(response.content)
+
+    server.reset_peak_rss()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    timings.sort()
+    return ScenarioResult(
+        name=name,
+        params=params,
+        requests=requests,
+        errors=len(errors),
+        duration_s=duration,
+        requests_per_s=len(timings) / duration,
+        rows_per_s=len(timings) * rows_per_request / duration if rows_per_request else None,
+        bytes_per_s=transferred / duration,
+        latency_ms={
+            "mean": sum(timings) / len(timings) * 1000 if timings else 0.0,
+            "p50": percentile(timings, 0.50) * 1000,
+            "p95": percentile(timings, 0.95) * 1000,
+            "p99": percentile(timings, 0.99) * 1000,
+            "max": timings[-1] * 1000 if timings else 0.0,
+        },
+        server_peak_rss_mb=server.peak_rss_mb(),
+        client_peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        error_samples=errors[:5],
+    )
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(results: list[ScenarioResult], args: dict, output: Optional[str]) -> Path:
+    """
+    Записывает результаты вместе с условиями запуска, чтобы прогоны
+    на разных ревизиях можно было сравнить через benchmarks.compare.
+    """
+    now = datetime.now(timezone.utc)
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = RESULTS_DIR / f"{now:%Y%m%dT%H%M%SZ}.json"
+    else:
+        path = Path(output)
+    path.write_text(json.dumps({
+        "started_at": now.isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": args,
+        "scenarios": [asdict(result) for result in results],
+    }, indent=2))
+    return path
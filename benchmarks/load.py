@@ -0,0 +1,394 @@
+"""
+Нагрузочные сценарии для сервиса: параллельная загрузка файлов,
+листинг файлов пользователя с большим числом записей, поиск по его
+файлам, много мелких авторизованных запросов и админские списки. Для каждого сценария
+выводятся пропускная способность, p50/p95/p99 и пиковая память
+сервера, а результаты пишутся в JSON (benchmarks/results/).
+
+Нужны PostgreSQL с примененными миграциями и S3-совместимое хранилище
+из .env (MinIO из docker-compose или, например, moto_server).
+Приложение запускается отдельным процессом, либо передайте --url
+уже запущенного (и --server-pid, чтобы мерить его память).
+Тестовые пользователи и записи создаются с email вида *@bench.example.com
+и переиспользуются между прогонами.
+
+    python -m benchmarks.load
+    python -m benchmarks.load --scenarios uploads --upload-sizes-mb 1,500 --uploads 4
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import asyncio
+import itertools
+import os
+from typing import AsyncIterator, Optional
+
+import httpx
+from sqlalchemy import text
+
+from app.auth.jwt import create_access_token
+from app.core.config import settings
+from app.db.session import async_session
+from benchmarks.harness import ScenarioResult, Server, run_scenario, write_results
+
+BENCH_DOMAIN = "bench.example.com"
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+DELETE_BATCH_SIZE = 1000
+
+
+def auth_headers(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(user_id)}"}
+
+
+async def ensure_users(prefix: str, count: int) -> list[int]:
+    async with async_session() as db:
+        await db.execute(
+            text(
+                "INSERT INTO users (yandex_id, email, first_name) "
+                "SELECT :prefix || i, :prefix || i || '@' || :domain, 'Bench' "
+                "FROM generate_series(1, CAST(:count AS integer)) AS i "
+                "ON CONFLICT DO NOTHING"
+            ),
+            {"prefix": prefix, "domain": BENCH_DOMAIN, "count": count}
+        )
+        await db.execute(
+            text(
+                "INSERT INTO user_usage (user_id, size_bytes, files) "
+                "SELECT id, 0, 0 FROM users WHERE email LIKE :pattern "
+                "ON CONFLICT DO NOTHING"
+            ),
+            {"pattern": f"{prefix}%@{BENCH_DOMAIN}"}
+        )
+        await db.commit()
+        result = await db.execute(
+            text(
+                "SELECT id FROM users WHERE email LIKE :pattern ORDER BY id LIMIT :count"
+            ),
+            {"pattern": f"{prefix}%@{BENCH_DOMAIN}", "count": count}
+        )
+        return list(result.scalars())
+
+
+async def ensure_admin() -> int:
+    async with async_session() as db:
+        result = await db.execute(
+            text(
+                "INSERT INTO users (yandex_id, email, first_name) "
+                "VALUES (:email, :email, 'Admin') "
+                "ON CONFLICT (email) DO UPDATE SET email = excluded.email "
+                "RETURNING id"
+            ),
+            {"email": settings.ADMIN_EMAIL}
+        )
+        await db.commit()
+        return result.scalar_one()
+
+
+async def ensure_audio_rows(user_id: int, rows: int) -> None:
+    """
+    Дозаполняет записи пользователя до rows одним INSERT ... SELECT.
+    Объектов в хранилище у них нет, для листинга они не нужны.
+    """
+    async with async_session() as db:
+        existing = (await db.execute(
+            text("SELECT count(*) FROM audio_files WHERE user_id = :user_id"),
+            {"user_id": user_id}
+        )).scalar_one()
+        if existing >= rows:
+            return
+        print(f"Seeding {rows - existing} audio files for user {user_id}...")
+        await db.execute(
+            text(
+                "INSERT INTO audio_files "
+                "(user_id, filename, original_filename, storage_path, size_bytes, "
+                "duration, codec, sample_rate, channels, bitrate, created_at) "
+                "SELECT :user_id, 'track-' || i || '.mp3', 'track-' || i || '.mp3', "
+                "'bench/' || :user_id || '/' || i || '.mp3', 4000000 + i, "
+                "180 + i % 120, 'mp3', 44100, 2, 192000, "
+                "now() - i * interval '1 second' "
+                "FROM generate_series(CAST(:start AS integer), CAST(:rows AS integer)) AS i"
+            ),
+            {"user_id": user_id, "start": existing + 1, "rows": rows}
+        )
+        # Счетчики использования приложение ведет само, здесь их нужно поправить вручную
+        await db.execute(
+            text(
+                "INSERT INTO user_usage (user_id, size_bytes, files, last_upload_at) "
+                "SELECT user_id, sum(size_bytes), count(*), max(created_at) FROM audio_files "
+                "WHERE user_id = :user_id GROUP BY user_id "
+                "ON CONFLICT (user_id) DO UPDATE "
+                "SET size_bytes = excluded.size_bytes, files = excluded.files, "
+                "last_upload_at = excluded.last_upload_at"
+            ),
+            {"user_id": user_id}
+        )
+        await db.commit()
+        # Статистика нужна планировщику для новых строк; ANALYZE идет в
+        # отдельной транзакции после вставки, и ее тоже нужно зафиксировать
+        await db.execute(text("ANALYZE audio_files"))
+        await db.commit()
+
+
+async def collect_cursors(
+    client: httpx.AsyncClient,
+    path: str,
+    headers: dict,
+    pages: int,
+    limit: int,
+    extra_params: Optional[dict] = None
+) -> list[Optional[str]]:
+    """
+    Проходит страницы по порядку и запоминает курсоры, чтобы потом
+    запрашивать их вразнобой. Курсор неполной последней страницы
+    отбрасывается, так что по каждому курсору приходит ровно limit строк
+    (кроме первой страницы, если записей меньше limit).
+    """
+    cursors: list[Optional[str]] = [None]
+    while len(cursors) < pages:
+        params = {"limit": limit, **(extra_params or {})}
+        if cursors[-1] is not None:
+            params["after"] = cursors[-1]
+        response = await client.get(path, params=params, headers=headers)
+        response.raise_for_status()
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            if len(cursors) > 1 and len(response.json()) < limit:
+                cursors.pop()
+            break
+        cursors.append(cursor)
+    return cursors
+
+
+async def upload_body(size: int, block: bytes) -> AsyncIterator[bytes]:
+    # Уникальное начало, чтобы загрузки не схлопывались дедупликацией
+    yield os.urandom(16)
+    remaining = size - 16
+    while remaining > 0:
+        chunk = block[:remaining]
+        remaining -= len(chunk)
+        yield chunk
+
+
+async def uploads(
+    server: Server, client: httpx.AsyncClient, args: argparse.Namespace
+) -> list[ScenarioResult]:
+    user_id, = await ensure_users("bench-upload-", 1)
+    headers = {**auth_headers(user_id), "Content-Type": "audio/mpeg"}
+    block = os.urandom(UPLOAD_BLOCK_SIZE)
+    results = []
+    for size_mb in args.upload_sizes_mb:
+        size = size_mb * 1024 * 1024
+        uploaded = []
+
+        async def call(index: int) -> httpx.Response:
+            response = await client.post(
+                f"{server.url}/audio/upload/stream",
+                params={"filename": f"bench-{size_mb}mb-{index}.mp3"},
+                content=upload_body(size, block),
+                headers=headers
+            )
+            if response.status_code < 400:
+                uploaded.append(response.json()["id"])
+            return response
+
+        results.append(await run_scenario(
+            server,
+            "uploads",
+            {"size_mb": size_mb, "concurrency": args.upload_concurrency},
+            call,
+            requests=args.uploads,
+            concurrency=args.upload_concurrency,
+            request_bytes=lambda index: size
+        ))
+        results[-1].report()
+        if not args.keep:
+            for start in range(0, len(uploaded), DELETE_BATCH_SIZE):
+                ids = uploaded[start:start + DELETE_BATCH_SIZE]
+                await client.delete(
+                    f"{server.url}/audio/", params={"ids": ids}, headers=headers
+                )
+    return results
+
+
+async def listing(
+    server: Server, client: httpx.AsyncClient, args: argparse.Namespace
+) -> list[ScenarioResult]:
+    results = []
+    for rows, limit in itertools.product(args.list_rows, args.list_limit):
+        user_id, = await ensure_users(f"bench-list-{rows}-", 1)
+        await ensure_audio_rows(user_id, rows)
+        headers = auth_headers(user_id)
+        cursors = await collect_cursors(
+            client, f"{server.url}/audio/", headers, args.requests, limit
+        )
+
+        async def call(index: int) -> httpx.Response:
+            params = {"limit": limit}
+            cursor = cursors[index % len(cursors)]
+            if cursor is not None:
+                params["after"] = cursor
+            return await client.get(f"{server.url}/audio/", params=params, headers=headers)
+
+        results.append(await run_scenario(
+            server,
+            "listing",
+            {"rows": rows, "limit": limit, "concurrency": args.concurrency},
+            call,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            rows_per_request=limit
+        ))
+        results[-1].report()
+    return results
+
+
+async def search(
+    server: Server, client: httpx.AsyncClient, args: argparse.Namespace
+) -> list[ScenarioResult]:
+    rows = max(args.list_rows)
+    user_id, = await ensure_users(f"bench-list-{rows}-", 1)
+    await ensure_audio_rows(user_id, rows)
+    headers = auth_headers(user_id)
+    # Точные и неточные запросы к именам вида track-<номер>.mp3
+    queries = [f"track-{rows // (index + 2)}" for index in range(50)] + ["trak-12", "tracks 42", "mp3"]
+
+    async def call(index: int) -> httpx.Response:
+        return await client.get(
+            f"{server.url}/audio/search",
+            params={"q": queries[index % len(queries)], "limit": 20},
+            headers=headers
+        )
+
+    result = await run_scenario(
+        server,
+        "search",
+        {"rows": rows, "concurrency": args.concurrency},
+        call,
+        requests=args.requests,
+        concurrency=args.concurrency
+    )
+    result.report()
+    return [result]
+
+
+async def auth(
+    server: Server, client: httpx.AsyncClient, args: argparse.Namespace
+) -> list[ScenarioResult]:
+    user_ids = await ensure_users("bench-auth-", args.auth_users)
+    headers = [auth_headers(user_id) for user_id in user_ids]
+
+    async def call(index: int) -> httpx.Response:
+        # Пользователи по кругу, чтобы запросы не попадали в кэш подряд
+        return await client.get(
+            f"{server.url}/audio/", params={"limit": 1}, headers=headers[index % len(headers)]
+        )
+
+    result = await run_scenario(
+        server,
+        "auth",
+        {"users": len(user_ids), "concurrency": args.concurrency},
+        call,
+        requests=args.requests,
+        concurrency=args.concurrency
+    )
+    result.report()
+    return [result]
+
+
+async def admin(
+    server: Server, client: httpx.AsyncClient, args: argparse.Namespace
+) -> list[ScenarioResult]:
+    await ensure_users("bench-auth-", args.auth_users)
+    rows = max(args.list_rows)
+    list_user_id, = await ensure_users(f"bench-list-{rows}-", 1)
+    await ensure_audio_rows(list_user_id, rows)
+    headers = auth_headers(await ensure_admin())
+    pages = args.requests // 2
+    # Дашборд: пользователи со статистикой, самые крупные первыми
+    stats_params = {"with_stats": "true", "sort_by": "size_bytes", "order": "desc"}
+    audio_path = f"{server.url}/admin/users/{list_user_id}/audio"
+    results = []
+    for limit in args.list_limit:
+        user_cursors = await collect_cursors(
+            client, f"{server.url}/admin/users", headers, pages, limit, stats_params
+        )
+        audio_cursors = await collect_cursors(client, audio_path, headers, pages, limit)
+        # Поровну страниц списка пользователей и файлов одного пользователя
+        targets = list(itertools.chain.from_iterable(
+            ((f"{server.url}/admin/users", user_cursor), (audio_path, audio_cursor))
+            for user_cursor, audio_cursor in zip(itertools.cycle(user_cursors), audio_cursors)
+        ))
+
+        async def call(index: int) -> httpx.Response:
+            path, cursor = targets[index % len(targets)]
+            params = {"limit": limit}
+            if path.endswith("/users"):
+                params.update(stats_params)
+            if cursor is not None:
+                params["after"] = cursor
+            return await client.get(path, params=params, headers=headers)
+
+        results.append(await run_scenario(
+            server,
+            "admin",
+            {"users": args.auth_users, "rows": rows, "limit": limit, "concurrency": args.concurrency},
+            call,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            rows_per_request=limit
+        ))
+        results[-1].report()
+    return results
+
+
+SCENARIOS = {
+    "uploads": uploads,
+    "listing": listing,
+    "search": search,
+    "auth": auth,
+    "admin": admin,
+}
+
+
+async def main(args: argparse.Namespace) -> None:
+    server = Server(args.url, args.server_pid)
+    await server.start()
+    results = []
+    try:
+        limits = httpx.Limits(max_connections=max(args.concurrency, args.upload_concurrency))
+        async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+            for name in args.scenarios:
+                results.extend(await SCENARIOS[name](server, client, args))
+    finally:
+        server.stop()
+    path = write_results(results, vars(args), args.output)
+    print(f"Results written to {path}")
+
+
+def int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def scenario_list(value: str) -> list[str]:
+    names = value.split(",")
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return names
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=scenario_list, default=list(SCENARIOS))
+    parser.add_argument("--url", help="Адрес уже запущенного приложения")
+    parser.add_argument("--server-pid", type=int, help="PID приложения из --url для замера памяти")
+    parser.add_argument("--output", help="Файл результатов (по умолчанию benchmarks/results/<время>.json)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--upload-sizes-mb", type=int_list, default=[1, 10, 100, 500])
+    parser.add_argument("--uploads", type=int, default=8, help="Загрузок каждого размера")
+    parser.add_argument("--upload-concurrency", type=int, default=4)
+    parser.add_argument("--list-rows", type=int_list, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--list-limit", type=int_list, default=[100, 1000], help="Размеры страниц списков")
+    parser.add_argument("--auth-users", type=int, default=1000)
+    parser.add_argument("--keep", action="store_true", help="Не удалять загруженные файлы")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,59 @@
+"""
+Сравнивает накладные расходы на запрос к MinIO при создании нового
+S3 клиента на каждый запрос и при использовании общего клиента.
+
+Запуск (нужен доступный MinIO из .env):
+    python -m benchmarks.s3_client_overhead --requests 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.core.s3 import s3_client
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(
+        f"{name:<16} "
+        f"mean={statistics.mean(timings) * 1000:8.2f}ms "
+        f"p50={statistics.median(timings) * 1000:8.2f}ms "
+        f"p99={p99 * 1000:8.2f}ms"
+    )
+
+
+async def per_request_client(requests: int) -> list[float]:
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        async with await s3_client.get_client() as client:
+            await client.head_bucket(Bucket=s3_client.bucket_name)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+async def shared_client(requests: int) -> list[float]:
+    timings = []
+    await s3_client.start()
+    try:
+        for _ in range(requests):
+            started = time.perf_counter()
+            await s3_client.client.head_bucket(Bucket=s3_client.bucket_name)
+            timings.append(time.perf_counter() - started)
+    finally:
+        await s3_client.close()
+    return timings
+
+
+async def main(requests: int) -> None:
+    report("per-request", await per_request_client(requests))
+    report("shared", await shared_client(requests))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))